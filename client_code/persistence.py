@@ -4,7 +4,10 @@
 # https://github.com/anvilistas/anvil-extras/graphs/contributors
 #
 # This software is published at https://github.com/anvilistas/anvil-extras
+from time import time as _time
+
 import anvil.server
+import anvil.tables as _tables
 
 from .utils._warnings import warn as _warn
 
@@ -94,14 +97,83 @@ class LinkedClass:
         instance._delta[self._linked_column] = value
 
 
+class _IdentityMap:
+    """A cache of persisted objects by key, with optional LRU eviction and expiry
+
+    A plain dict keeps its insertion order, so the least recently used entry is
+    always the first one and a hit moves its entry to the end.
+    """
+
+    def __init__(self, max_size=None, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = {}
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        try:
+            obj, expires = self._entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            raise
+        if expires is not None and _time() >= expires:
+            self.misses += 1
+            raise KeyError(key)
+        self._entries[key] = (obj, expires)
+        self.hits += 1
+        return obj
+
+    def peek(self, key):
+        "Return the live entry for key, or None, without affecting the statistics"
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        obj, expires = entry
+        if expires is not None and _time() >= expires:
+            del self._entries[key]
+            return None
+        return obj
+
+    def set(self, key, obj):
+        self._entries.pop(key, None)
+        expires = None if self.ttl is None else _time() + self.ttl
+        self._entries[key] = (obj, expires)
+        if self.max_size is not None:
+            while len(self._entries) > self.max_size:
+                del self._entries[next(iter(self._entries))]
+                self.evictions += 1
+
+    def discard(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.peek(key) is not None
+
+
 class PersistedClass:
     key = None
+    cache_size = None
+    cache_ttl = None
 
     @classmethod
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
         cls._snake_name = _snakify(cls.__name__)
-        cls._cache = {}
+        cls._cache = _IdentityMap(cls.cache_size, cls.cache_ttl)
         for attr, value in cls.__dict__.items():
             try:
                 is_persisted_class = issubclass(value, PersistedClass)
@@ -117,22 +189,38 @@ class PersistedClass:
         if lazy:
             return (cls(store=row) for row in rows)
 
-        result = [cls(store=row) for row in rows]
-        cls._cache.clear()
-        for obj in result:
-            cls._cache[getattr(obj, cls.key)] = obj
+        result = []
+        for row in rows:
+            obj = cls(store=row)
+            key = getattr(obj, cls.key)
+            # an object we already hold keeps its identity and unsaved changes
+            cached = cls._cache.peek(key)
+            if cached is not None:
+                cached._store = obj._store
+                obj = cached
+            cls._cache.set(key, obj)
+            result.append(obj)
         return result
 
     @classmethod
     def get(cls, key):
         try:
-            return cls._cache[key]
+            return cls._cache.get(key)
         except KeyError:
             row = anvil.server.call(f"get_{cls._snake_name}", **{cls.key: key})
             obj = cls(store=row)
-            cls._cache[key] = obj
+            cls._cache.set(key, obj)
             return obj
 
+    @classmethod
+    def cache_stats(cls):
+        "The size of the class's cache along with its hits, misses and evictions"
+        return cls._cache.stats()
+
+    @classmethod
+    def clear_cache(cls):
+        cls._cache.clear()
+
     def __init__(self, store=None, *args, **kwargs):
         self._store = store or {}
         self._delta = kwargs
@@ -170,13 +258,35 @@ class PersistedClass:
             return NotImplemented
         return getattr(self, self.key) == getattr(other, other.key)
 
+    def _stored_key(self):
+        "The key in the row behind this object, or None if there is no such row"
+        if self.key is None:
+            return None
+        try:
+            return self._store[self.key]
+        except (KeyError, _tables.NoSuchColumnError, _tables.RowDeleted):
+            return None
+
+    def _rekey(self, old_key):
+        "Move the cache entry for old_key to this object's current key"
+        if self.key is None:
+            return
+        new_key = getattr(self, self.key)
+        if new_key == old_key:
+            return
+        self._cache.discard(old_key)
+        if new_key is not None:
+            self._cache.set(new_key, self)
+
     def add(self, *args, **kwargs):
         self._store = anvil.server.call(
             f"add_{self._snake_name}", _serialise_delta(self._delta), *args, **kwargs
         )
+        self._rekey(None)
         self._delta.clear()
 
     def update(self, *args, **kwargs):
+        old_key = self._stored_key()
         anvil.server.call(
             f"update_{self._snake_name}",
             self._store,
@@ -184,10 +294,15 @@ class PersistedClass:
             *args,
             **kwargs,
         )
+        self._rekey(old_key)
         self._delta.clear()
 
     def delete(self, *args, **kwargs):
+        # the row can't be read once it has been deleted
+        key = self._stored_key()
         anvil.server.call(f"delete_{self._snake_name}", self._store, *args, **kwargs)
+        if key is not None:
+            self._cache.discard(key)
         self._delta.clear()
 
     def reset(self):
@@ -14,6 +14,7 @@ from ._types import (
     coerce,
     date,
     datetime,
+    discriminated_union,
     enum,
     float,
     integer,
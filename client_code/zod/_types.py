@@ -11,7 +11,7 @@ from datetime import datetime as _datetime
 from anvil import is_server_side
 
 from ._zod_error import ZodError, ZodIssueCode
-from .helpers import ZodParsedType, get_parsed_type, regex, util
+from .helpers import ZodParsedType, get_parsed_type, parallel_util, regex, util
 from .helpers.dict_util import getitem, merge_shapes
 from .helpers.parse_util import (
     ABORTED,
@@ -40,6 +40,8 @@ list_ = list
 
 
 class ParseInputLazyPath:
+    __slots__ = ("parent", "data", "_path", "_key")
+
     def __init__(self, parent, value, path, key):
         self.parent = parent
         self.data = value
@@ -61,6 +63,132 @@ def handle_result(ctx, result):
         return ParseResult(success=False, data=None, error=error)
 
 
+class _Invalid(Exception):
+    "raised by a compiled validator when the data is invalid"
+
+
+class _Fallback(Exception):
+    "raised by a compiled validator when the data needs a full parse"
+
+
+_IN_PROGRESS = object()
+# key in Common.memo for the _EffectLog of a compiled validator
+_EFFECT_LOG = object()
+
+
+def _identity(data, common):
+    return data
+
+
+class _EffectLog:
+    """The transforms run by a compiled validator, in the order they ran
+
+    If the compiled validator fails, the full parse replays the results rather than
+    running the transforms again, so a transform with side effects only runs once.
+    """
+
+    def __init__(self):
+        # id(schema) -> [next position, [(value, result, issues), ...]]
+        self.calls = {}
+
+    def record(self, schema, value, result, issues):
+        entry = self.calls.get(id(schema))
+        if entry is None:
+            entry = self.calls[id(schema)] = [0, []]
+        entry[1].append((value, result, issues))
+
+    def replay(self, schema, value):
+        "returns the next recorded call of schema for value, or None"
+        entry = self.calls.get(id(schema))
+        if entry is None:
+            return None
+        pos, calls = entry
+        if pos < len(calls) and calls[pos][0] == value:
+            entry[0] = pos + 1
+            return calls[pos]
+        # out of step with the compiled validator - run the rest of the calls
+        entry[0] = len(calls)
+        return None
+
+
+def _record_effect(schema, fn, value, check_ctx, common):
+    # called by compiled validators - check_ctx is None for a preprocess
+    memo = common.memo
+    if memo is None:
+        memo = common.memo = {}
+    log = memo.get(_EFFECT_LOG)
+    if log is None:
+        log = memo[_EFFECT_LOG] = _EffectLog()
+    if check_ctx is None:
+        result = fn(value)
+        log.record(schema, value, result, ())
+    else:
+        result = fn(value, check_ctx)
+        log.record(schema, value, result, check_ctx.issues)
+    return result
+
+
+def _apply_effect(schema, fn, value, check_ctx, common):
+    # called by _parse - replays a call already made by a compiled validator
+    memo = common.memo
+    log = memo.get(_EFFECT_LOG) if memo else None
+    call = log.replay(schema, value) if log is not None else None
+    if call is None:
+        return fn(value) if check_ctx is None else fn(value, check_ctx)
+    _, result, issues = call
+    for args, issue_data in issues:
+        check_ctx.add_issue(*args, **issue_data)
+    return result
+
+
+def _compile_schema(schema, memo):
+    # memo maps id(schema) -> (schema, validator)
+    # holding the schema keeps its id from being reused while compiling
+    compiled = memo.get(id(schema))
+    if compiled is None:
+        compiled = memo[id(schema)] = (schema, schema._compile(memo))
+    return compiled[1]
+
+
+def _data_or_raise(results):
+    for result in results:
+        if not result.success:
+            raise result.error
+        yield result.data
+
+
+def _parse_in_processes(ctx, status, parse_range, size, merged, workers, chunk_size):
+    # parse_range(ctx, status, start, stop) is called in forked worker processes
+    # each shard gets its own issue buffer, the results are merged back in order
+    if size <= chunk_size:
+        return parse_range(ctx, status, 0, size)
+
+    def parse_shard(start, stop):
+        shard_ctx = ctx.copy(common=ctx.common.copy(issues=[]))
+        result = parse_range(shard_ctx, ParseStatus(), start, stop)
+        return result.status, result.value, shard_ctx.common.issues
+
+    shards = parallel_util.map_shards(parse_shard, size, chunk_size, workers)
+    if shards is None:
+        return parse_range(ctx, status, 0, size)
+
+    merge = merged.extend if type(merged) is list_ else merged.update
+    for shard_status, value, issues in shards:
+        ctx.common.issues.extend(issues)
+        if shard_status == ABORTED:
+            status.abort()
+        elif shard_status == DIRTY:
+            status.dirty()
+        if status.value != VALID and ctx.common.abort_early:
+            return INVALID
+        if value is not None:
+            merge(value)
+
+    if status.value == ABORTED:
+        return INVALID
+    return ParseReturn(status.value, merged)
+
+
 def _check_error_cb(rv):
     assert (
         type(rv) is dict and "message" in rv
@@ -127,6 +255,14 @@ class ZodType:
     def _parse(self, input):
         raise NotImplementedError("should be implemented by subclass")
 
+    def _compile(self, memo):
+        # subclasses override this with a specialised validator
+        # without one, CompiledSchema parses with the caller's context instead
+        def validate(data, common):
+            raise _Fallback
+
+        return validate
+
     def _get_type(self, input):
         return get_parsed_type(input.data)
 
@@ -143,6 +279,22 @@ class ZodType:
     def _process_input_params(self, input: ParseInput):
         return ParseStatus(), self._get_or_return_ctx(input)
 
+    def _root_context(self, data, params):
+        "the context for a parse of data from the keyword arguments to safe_parse"
+        return ParseContext(
+            common=Common(
+                issues=[],
+                contextual_error_map=params.get("error_map"),
+                abort_early=params.get("abort_early", False),
+                copy_output=params.get("copy", True),
+            ),
+            path=params.get("path", []),
+            schema_error_map=self._def.get("error_map"),
+            parent=None,
+            data=data,
+            parsed_type=get_parsed_type(data),
+        )
+
     def parse(self, data, **params):
         result = self.safe_parse(data, **params)
         if result.success:
@@ -150,18 +302,56 @@ class ZodType:
         raise result.error
 
     def safe_parse(self, data, **params):
-        ctx = ParseContext(
-            common=Common(issues=[], contextual_error_map=params.get("error_map")),
-            path=params.get("path", []),
-            schema_error_map=self._def.get("error_map"),
-            parent=None,
-            data=data,
-            parsed_type=get_parsed_type(data),
-        )
+        ctx = self._root_context(data, params)
         input = ParseInput(data, path=ctx.path, parent=ctx)
         result = self._parse(input)
         return handle_result(ctx, result)
 
+    def parse_many(self, iterable, **params):
+        "lazily yields the parsed value of each item - raises a ParseError at the first invalid item"
+        return _data_or_raise(self.safe_parse_many(iterable, **params))
+
+    def safe_parse_many(self, iterable, **params):
+        "lazily yields a ParseResult for each item - issue paths start with the item's index"
+        ctx = self._root_context(iterable, params)
+        common = ctx.common
+        for i, item in enumerate(iterable):
+            # each item starts with no issues and no memoised results
+            # an error keeps its own list, and nothing outlives the item
+            common.issues = []
+            common.memo = None
+            result = self._parse(ParseInputLazyPath(ctx, item, ctx.path, i))
+            yield handle_result(ctx, result)
+
+    def parse_parallel(self, data, workers=None, chunk_size=1000, **params):
+        result = self.safe_parse_parallel(
+            data, workers=workers, chunk_size=chunk_size, **params
+        )
+        if result.success:
+            return result.data
+        raise result.error
+
+    def safe_parse_parallel(self, data, workers=None, chunk_size=1000, **params):
+        "server only - the items of a list or mapping are parsed in a pool of worker processes"
+        if not is_server_side():
+            return self.safe_parse(data, **params)
+        ctx = self._root_context(data, params)
+        input = ParseInput(data, path=ctx.path, parent=ctx)
+        result = self._parse_parallel(input, workers, chunk_size)
+        return handle_result(ctx, result)
+
+    def _parse_parallel(self, input, workers, chunk_size):
+        # only lists and mappings are split between processes
+        return self._parse(input)
+
+    def validator(self, **params):
+        "returns an IncrementalValidator - for typed_dict schemas, optionally with refinements"
+        return IncrementalValidator(self, **params)
+
+    def compile(self):
+        "returns a CompiledSchema - a faster equivalent of this schema for repeated parsing"
+        return CompiledSchema(self)
+
     def list(self):
         return ZodList._create(self)
 
@@ -241,6 +431,95 @@ class ZodType:
         return ZodPipeline._create(self, target)
 
 
+def _compile_url_check():
+    if is_server_side():
+        return regex.URL.match
+
+    from anvil.js.window import URL
+
+    def check_url(data):
+        try:
+            URL(data)
+        except Exception:
+            return False
+        return True
+
+    return check_url
+
+
+def _compile_date_check(kind, format):
+    if format is not None:
+        parse = lambda data: _datetime.strptime(data, format)  # noqa E731
+    elif kind == "datetime":
+        parse = _datetime.fromisoformat
+    else:
+        parse = _date.fromisoformat
+
+    def check_date(data):
+        try:
+            parse(data)
+        except Exception:
+            return False
+        return True
+
+    return check_date
+
+
+_STRING_FORMATS = ("email", "uuid", "url", "regex", "datetime", "date")
+
+
+def _string_format_matcher(check):
+    kind = check["kind"]
+    if kind == "email":
+        return regex.EMAIL.match
+    elif kind == "uuid":
+        return regex.UUID.match
+    elif kind == "url":
+        return _compile_url_check()
+    elif kind == "regex":
+        return regex.compile(check["regex"]).match
+    else:
+        return _compile_date_check(kind, check["format"])
+
+
+def _get_matcher(check):
+    # resolved on first use and kept with the check, so defining a schema
+    # doesn't load or compile any patterns
+    match = check.get("match")
+    if match is None:
+        match = check["match"] = _string_format_matcher(check)
+    return match
+
+
+def _compile_string_check(check):
+    kind = check["kind"]
+
+    if kind == "strip":
+        return True, str.strip
+    elif kind == "lower":
+        return True, str.lower
+    elif kind == "upper":
+        return True, str.upper
+
+    value = check.get("value")
+    if kind == "min":
+        fn = lambda data: len(data) >= value  # noqa E731
+    elif kind == "max":
+        fn = lambda data: len(data) <= value  # noqa E731
+    elif kind in _STRING_FORMATS:
+        fn = _get_matcher(check)
+    elif kind == "startswith":
+        fn = lambda data: data.startswith(value)  # noqa E731
+    elif kind == "endswith":
+        fn = lambda data: data.endswith(value)  # noqa E731
+    elif kind == "datetime" or kind == "date":
+        fn = _compile_date_check(kind, check["format"])
+    else:
+        assert False
+
+    return False, fn
+
+
 class ZodString(ZodType):
     _type = ZodParsedType.string
     _type_name = _type
@@ -254,7 +533,10 @@ class ZodString(ZodType):
 
         status = ParseStatus()
         ctx = None
+        abort_early = input.parent.common.abort_early
         for check in self._def["checks"]:
+            if abort_early and status.value is not VALID:
+                return INVALID
             kind = check["kind"]
 
             if kind == "min":
@@ -283,57 +565,13 @@ class ZodString(ZodType):
                     )
                     status.dirty()
 
-            elif kind == "email":
-                if not regex.EMAIL.match(input.data):
-                    ctx = self._get_or_return_ctx(input, ctx)
-                    add_issue_to_context(
-                        ctx,
-                        code=ZodIssueCode.invalid_string,
-                        validation="email",
-                        message=check["message"],
-                    )
-                    status.dirty()
-
-            elif kind == "uuid":
-                if not regex.UUID.match(input.data):
+            elif kind in _STRING_FORMATS:
+                if not _get_matcher(check)(input.data):
                     ctx = self._get_or_return_ctx(input, ctx)
                     add_issue_to_context(
                         ctx,
                         code=ZodIssueCode.invalid_string,
-                        validation="uuid",
-                        message=check["message"],
-                    )
-                    status.dirty()
-
-            elif kind == "url":
-                url_valid = True
-                if not is_server_side():
-                    from anvil.js.window import URL
-
-                    try:
-                        URL(input.data)
-                    except Exception:
-                        url_valid = False
-                else:
-                    url_valid = regex.URL.match(input.data)
-                if not url_valid:
-                    ctx = self._get_or_return_ctx(input, ctx)
-                    add_issue_to_context(
-                        ctx,
-                        code=ZodIssueCode.invalid_string,
-                        validation="url",
-                        message=check["message"],
-                    )
-                    status.dirty()
-
-            elif kind == "regex":
-                match = check["regex"].match(input.data)
-                if match is None:
-                    ctx = self._get_or_return_ctx(input, ctx)
-                    add_issue_to_context(
-                        ctx,
-                        code=ZodIssueCode.invalid_string,
-                        validation="regex",
+                        validation=kind,
                         message=check["message"],
                     )
                     status.dirty()
@@ -367,30 +605,30 @@ class ZodString(ZodType):
                     )
                     status.dirty()
 
-            elif kind == "datetime" or kind == "date":
-                format = check["format"]
-                try:
-                    if format is not None:
-                        _datetime.strptime(input.data, format)
-                    elif kind == "datetime":
-                        _datetime.fromisoformat(input.data)
-                    else:
-                        _date.fromisoformat(input.data)
-                except Exception:
-                    ctx = self._get_or_return_ctx(input, ctx)
-                    add_issue_to_context(
-                        ctx,
-                        code=ZodIssueCode.invalid_string,
-                        validation=kind,
-                        message=check["message"],
-                    )
-                    status.dirty()
-
             else:
                 assert False
 
         return ParseReturn(status=status.value, value=input.data)
 
+    def _compile(self, memo):
+        coerce = self._def["coerce"]
+        # (is_transform, fn) pairs - transforms return new data, checks return truthy
+        steps = [_compile_string_check(check) for check in self._def["checks"]]
+
+        def validate(data, common):
+            if coerce:
+                data = str(data)
+            if type(data) is not str:
+                raise _Invalid
+            for is_transform, fn in steps:
+                if is_transform:
+                    data = fn(data)
+                elif not fn(data):
+                    raise _Invalid
+            return data
+
+        return validate
+
     def _add_check(self, **check):
         return ZodString({**self._def, "checks": [*self._def["checks"], check]})
 
@@ -469,7 +707,10 @@ class ZodAbstractNumber(ZodType):
         status = ParseStatus()
         ctx = None
 
+        abort_early = input.parent.common.abort_early
         for check in self._def["checks"]:
+            if abort_early and status.value is not VALID:
+                return INVALID
             kind = check["kind"]
 
             if kind == "int":
@@ -522,11 +763,56 @@ class ZodAbstractNumber(ZodType):
 
         return ParseReturn(status=status.value, value=input.data)
 
+    def _compile(self, memo):
+        types = self._type if type(self._type) is list_ else [self._type]
+        python_types = [
+            {ZodParsedType.integer: int, ZodParsedType.float: float_}[t] for t in types
+        ]
+        coerce = None
+        if self._def["coerce"]:
+            coerce = python_types[0]
+        checks = [_compile_number_check(check) for check in self._def["checks"]]
+
+        def validate(data, common):
+            if coerce is not None:
+                try:
+                    data = coerce(data)
+                except Exception:
+                    pass
+            if type(data) not in python_types:
+                raise _Invalid
+            for check in checks:
+                if not check(data):
+                    raise _Invalid
+            return data
+
+        return validate
+
     @classmethod
     def _create(cls, **params):
         return cls(dict(checks=[], coerce=False, **process_params(**params)))
 
 
+def _compile_limit_check(check):
+    value = check["value"]
+    inclusive = check.get("inclusive", True)
+    if check["kind"] == "min":
+        if inclusive:
+            return lambda data: data >= value
+        return lambda data: data > value
+    elif check["kind"] == "max":
+        if inclusive:
+            return lambda data: data <= value
+        return lambda data: data < value
+    assert False
+
+
+def _compile_number_check(check):
+    if check["kind"] == "int":
+        return lambda data: type(data) is not float_ or data.is_integer()
+    return _compile_limit_check(check)
+
+
 class ZodInteger(ZodAbstractNumber):
     _type = ZodParsedType.integer
     _type_name = _type
@@ -684,7 +970,10 @@ class ZodDateTime(ZodType):
 
         status = ParseStatus()
         ctx = None
+        abort_early = input.parent.common.abort_early
         for check in self._def["checks"]:
+            if abort_early and status.value is not VALID:
+                return INVALID
             kind = check["kind"]
 
             if kind == "min":
@@ -718,6 +1007,20 @@ class ZodDateTime(ZodType):
 
         return ParseReturn(status=status.value, value=input.data)
 
+    def _compile(self, memo):
+        python_type = _datetime if self._type == ZodParsedType.datetime else _date
+        checks = [_compile_limit_check(check) for check in self._def["checks"]]
+
+        def validate(data, common):
+            if type(data) is not python_type:
+                raise _Invalid
+            for check in checks:
+                if not check(data):
+                    raise _Invalid
+            return data
+
+        return validate
+
     def _add_check(self, **check):
         return ZodDateTime({**self._def, "checks": [*self._def["checks"], check]})
 
@@ -757,6 +1060,18 @@ class ZodBoolean(ZodType):
             return INVALID
         return OK(input.data)
 
+    def _compile(self, memo):
+        coerce = self._def["coerce"]
+
+        def validate(data, common):
+            if coerce:
+                data = bool(data)
+            if type(data) is not bool:
+                raise _Invalid
+            return data
+
+        return validate
+
     @classmethod
     def _create(cls, *, coerce=False, **params):
         return cls(dict(coerce=coerce, **process_params(**params)))
@@ -771,11 +1086,22 @@ class ZodNone(ZodType):
             return INVALID
         return OK(input.data)
 
+    def _compile(self, memo):
+        def validate(data, common):
+            if data is not None:
+                raise _Invalid
+            return data
+
+        return validate
+
 
 class ZodAny(ZodType):
     def _parse(self, input):
         return OK(input.data)
 
+    def _compile(self, memo):
+        return _identity
+
 
 class ZodUnknown(ZodType):
     _type = ZodParsedType.unknown
@@ -785,6 +1111,9 @@ class ZodUnknown(ZodType):
     def _parse(self, input):
         return OK(input.data)
 
+    def _compile(self, memo):
+        return _identity
+
 
 class ZodNever(ZodType):
     _type = ZodParsedType.never
@@ -800,6 +1129,12 @@ class ZodNever(ZodType):
         )
         return INVALID
 
+    def _compile(self, memo):
+        def validate(data, common):
+            raise _Invalid
+
+        return validate
+
 
 class ZodList(ZodType):
     _type = [ZodParsedType.list, ZodParsedType.tuple]
@@ -811,7 +1146,31 @@ class ZodList(ZodType):
         if self._check_invalid_type(input):
             return INVALID
 
+        self._parse_checks(ctx, status)
+        if ctx.common.abort_early and status.value is not VALID:
+            return INVALID
+
+        return self._parse_items(ctx, status, 0, len(ctx.data))
+
+    def _parse_parallel(self, input, workers, chunk_size):
+        status, ctx = self._process_input_params(input)
+
+        if self._check_invalid_type(input):
+            return INVALID
+
+        self._parse_checks(ctx, status)
+        if ctx.common.abort_early and status.value is not VALID:
+            return INVALID
+
+        return _parse_in_processes(
+            ctx, status, self._parse_items, len(ctx.data), [], workers, chunk_size
+        )
+
+    def _parse_checks(self, ctx, status):
+        abort_early = ctx.common.abort_early
         for check in self._def["checks"]:
+            if abort_early and status.value is not VALID:
+                return
             kind = check["kind"]
 
             if kind == "min":
@@ -838,14 +1197,39 @@ class ZodList(ZodType):
                     )
                     status.dirty()
 
+    def _parse_items(self, ctx, status, start, stop):
         type_schema = self._def["type"]
+        abort_early = ctx.common.abort_early
+        data = ctx.data
 
-        results = [
-            type_schema._parse(ParseInputLazyPath(ctx, item, ctx.path, i))
-            for i, item in enumerate(ctx.data)
-        ]
-
-        return ParseStatus.merge_list(status, results)
+        results = []
+        for i in range(start, stop):
+            result = type_schema._parse(ParseInputLazyPath(ctx, data[i], ctx.path, i))
+            if abort_early and result.status is not VALID:
+                return INVALID
+            results.append(result)
+
+        original = None
+        if not ctx.common.copy_output and start == 0 and stop == len(data):
+            original = data
+        return ParseStatus.merge_list(status, results, original)
+
+    def _compile(self, memo):
+        element = _compile_schema(self._def["type"], memo)
+        checks = [_compile_limit_check(check) for check in self._def["checks"]]
+
+        def validate(data, common):
+            t = type(data)
+            if t is not list_ and t is not tuple:
+                raise _Invalid
+            if checks:
+                length = len(data)
+                for check in checks:
+                    if not check(length):
+                        raise _Invalid
+            return [element(item, common) for item in data]
+
+        return validate
 
     @property
     def element(self):
@@ -885,6 +1269,16 @@ class ZodEnum(ZodType):
             return INVALID
         return OK(input.data)
 
+    def _compile(self, memo):
+        values = self._def["values"]
+
+        def validate(data, common):
+            if data not in values:
+                raise _Invalid
+            return data
+
+        return validate
+
     @property
     def options(self):
         return self._def["values"]
@@ -925,78 +1319,117 @@ class ZodTypedDict(ZodType):
         super().__init__(_def)
         self._cached = None
 
+    def _get_cached(self):
+        # shapes may be defined lazily so resolve on first use rather than in __init__
+        if self._cached is None:
+            shape = self._def["shape"]()
+            fields = [
+                (key, ParseReturn(VALID, key), schema) for key, schema in shape.items()
+            ]
+            if type(self._def["catchall"]) is ZodNever:
+                unknown_keys = self._def["unknown_keys"]
+                assert unknown_keys in (
+                    "passthrough",
+                    "strict",
+                    "strip",
+                ), "invalid unknown_keys value"
+            else:
+                unknown_keys = "catchall"
+            self._cached = (shape, fields, frozenset(shape), unknown_keys)
+        return self._cached
+
     def _parse(self, input):
         if self._check_invalid_type(input):
             return INVALID
 
         status, ctx = self._process_input_params(input)
-        shape = self.shape
-        shape_keys = shape.keys()
-        extra_keys = set()
+        _, fields, _, _ = self._get_cached()
+        data = ctx.data
+        pairs = []
+        abort_early = ctx.common.abort_early
 
-        if not (
-            type(self._def["catchall"]) is ZodNever
-            and self._def["unknown_keys"] == "strip"
-        ):
-            for key in ctx.data.keys():
-                if key not in shape_keys:
-                    extra_keys.add(key)
+        for key, key_return, key_validator in fields:
+            value = getitem(data, key, MISSING)
+            result = key_validator._parse(ParseInputLazyPath(ctx, value, ctx.path, key))
+            if abort_early and result.status is not VALID:
+                return INVALID
+            pairs.append((key_return, result, key in data))
 
-        pairs = []
+        if not self._parse_extra_keys(ctx, status, pairs):
+            return INVALID
+
+        original = None if ctx.common.copy_output else data
+        return ParseStatus.merge_dict(status, pairs, original)
+
+    def _parse_extra_keys(self, ctx, status, pairs):
+        # adds the keys not in the shape to pairs - returns False to abort early
+        _, _, shape_keys, unknown_keys = self._get_cached()
+        if unknown_keys == "strip":
+            return True
+
+        data = ctx.data
+        extra_keys = set(data.keys()).difference(shape_keys)
 
-        for key in shape_keys:
-            key_validator = shape[key]
-            value = getitem(ctx.data, key, MISSING)
-            pairs.append(
-                (
-                    ParseReturn(VALID, key),
-                    key_validator._parse(ParseInputLazyPath(ctx, value, ctx.path, key)),
-                    key in ctx.data,
+        if not extra_keys:
+            pass
+        elif unknown_keys == "passthrough":
+            for key in extra_keys:
+                pairs.append(
+                    (ParseReturn(VALID, key), ParseReturn(VALID, data[key]), False)
                 )
+        elif unknown_keys == "strict":
+            add_issue_to_context(
+                ctx, code=ZodIssueCode.unrecognized_keys, keys=extra_keys
             )
-
-        if type(self._def["catchall"]) is ZodNever:
-            unknown_keys = self._def["unknown_keys"]
-            if unknown_keys == "passthrough":
-                for key in extra_keys:
-                    pairs.append(
-                        (
-                            ParseReturn(VALID, key),
-                            ParseReturn(VALID, ctx.data[key]),
-                            False,
-                        )
-                    )
-            elif unknown_keys == "strict":
-                if extra_keys:
-                    add_issue_to_context(
-                        ctx, code=ZodIssueCode.unrecognized_keys, keys=extra_keys
-                    )
-                    status.dirty()
-            elif unknown_keys == "strip":
-                pass
-            else:
-                assert False, "invalid unknown_keys value"
+            status.dirty()
         else:
             # run cachall validation
             catchall = self._def["catchall"]
+            abort_early = ctx.common.abort_early
 
             for key in extra_keys:
-                value = ctx.data[key]
-                pairs.append(
-                    (
-                        ParseReturn(VALID, key),
-                        catchall._parse(
-                            ParseInputLazyPath(ctx, value, ctx.path, key),
-                        ),
-                        key in ctx.data,
-                    )
-                )
+                value = data[key]
+                result = catchall._parse(ParseInputLazyPath(ctx, value, ctx.path, key))
+                if abort_early and result.status is not VALID:
+                    return False
+                pairs.append((ParseReturn(VALID, key), result, True))
+
+        return True
+
+    def _compile(self, memo):
+        shape, _, shape_keys, unknown_keys = self._get_cached()
+        fields = [(key, _compile_schema(schema, memo)) for key, schema in shape.items()]
+        catchall = None
+        if unknown_keys == "catchall":
+            catchall = _compile_schema(self._def["catchall"], memo)
+
+        def validate(data, common):
+            if (
+                type(data) is not dict
+                and get_parsed_type(data) != ZodParsedType.mapping
+            ):
+                raise _Invalid
+            result = {}
+            for key, field in fields:
+                value = field(getitem(data, key, MISSING), common)
+                if value is not MISSING or key in data:
+                    result[key] = value
+            if unknown_keys == "strip":
+                return result
+            for key in set(data.keys()).difference(shape_keys):
+                if unknown_keys == "passthrough":
+                    result[key] = data[key]
+                elif unknown_keys == "strict":
+                    raise _Invalid
+                else:
+                    result[key] = catchall(data[key], common)
+            return result
 
-        return ParseStatus.merge_dict(status, pairs)
+        return validate
 
     @property
     def shape(self):
-        return self._def["shape"]()
+        return self._get_cached()[0]
 
     def strict(self, message=""):
         "reject if theere are extra keys"
@@ -1139,14 +1572,39 @@ class ZodTuple(ZodType):
 
         from itertools import zip_longest
 
-        results = [
-            schema._parse(ParseInputLazyPath(ctx, item, ctx.path, i))
-            for i, (item, schema) in enumerate(
-                zip_longest(ctx.data, items, fillvalue=rest)
-            )
-        ]
+        abort_early = ctx.common.abort_early
+        results = []
+        for i, (item, schema) in enumerate(
+            zip_longest(ctx.data, items, fillvalue=rest)
+        ):
+            result = schema._parse(ParseInputLazyPath(ctx, item, ctx.path, i))
+            if abort_early and result.status is not VALID:
+                return INVALID
+            results.append(result)
 
-        return ParseStatus.merge_list(status, results)
+        original = None if ctx.common.copy_output else ctx.data
+        return ParseStatus.merge_list(status, results, original)
+
+    def _compile(self, memo):
+        items = [_compile_schema(schema, memo) for schema in self._def["items"]]
+        rest = self._def["rest"]
+        if rest is not None:
+            rest = _compile_schema(rest, memo)
+        num_items = len(items)
+
+        def validate(data, common):
+            t = type(data)
+            if t is not list_ and t is not tuple:
+                raise _Invalid
+            length = len(data)
+            if length < num_items or (rest is None and length > num_items):
+                raise _Invalid
+            result = [item(value, common) for item, value in zip(items, data)]
+            if length > num_items:
+                result.extend(rest(value, common) for value in data[num_items:])
+            return result
+
+        return validate
 
     @property
     def items(self):
@@ -1169,23 +1627,60 @@ class ZodMapping(ZodType):
         if self._check_invalid_type(input):
             return INVALID
 
+        return self._parse_entries(ctx, status, ctx.data)
+
+    def _parse_parallel(self, input, workers, chunk_size):
+        status, ctx = self._process_input_params(input)
+        if self._check_invalid_type(input):
+            return INVALID
+
+        keys = list_(ctx.data)
+
+        def parse_range(ctx, status, start, stop):
+            return self._parse_entries(ctx, status, keys[start:stop])
+
+        return _parse_in_processes(
+            ctx, status, parse_range, len(keys), {}, workers, chunk_size
+        )
+
+    def _parse_entries(self, ctx, status, keys):
         key_type = self._def["key_type"]
         value_type = self._def["value_type"]
 
-        pairs = [
-            (
-                key_type._parse(ParseInputLazyPath(ctx, key, ctx.path, key)),
-                value_type._parse(
-                    ParseInputLazyPath(
-                        ctx, getitem(ctx.data, key, MISSING), ctx.path, key
-                    )
-                ),
-                False,
+        abort_early = ctx.common.abort_early
+        pairs = []
+        for key in keys:
+            key_result = key_type._parse(ParseInputLazyPath(ctx, key, ctx.path, key))
+            if abort_early and key_result.status is not VALID:
+                return INVALID
+            value_result = value_type._parse(
+                ParseInputLazyPath(ctx, getitem(ctx.data, key, MISSING), ctx.path, key)
             )
-            for key in ctx.data
-        ]
-
-        return ParseStatus.merge_dict(status, pairs)
+            if abort_early and value_result.status is not VALID:
+                return INVALID
+            pairs.append((key_result, value_result, False))
+
+        original = None if ctx.common.copy_output else ctx.data
+        return ParseStatus.merge_dict(status, pairs, original)
+
+    def _compile(self, memo):
+        key_type = _compile_schema(self._def["key_type"], memo)
+        value_type = _compile_schema(self._def["value_type"], memo)
+
+        def validate(data, common):
+            if (
+                type(data) is not dict
+                and get_parsed_type(data) != ZodParsedType.mapping
+            ):
+                raise _Invalid
+            result = {}
+            for key in data:
+                value = value_type(getitem(data, key, MISSING), common)
+                if value is not MISSING:
+                    result[key_type(key, common)] = value
+            return result
+
+        return validate
 
     @property
     def key_schema(self):
@@ -1206,17 +1701,78 @@ class ZodMapping(ZodType):
 
 
 class ZodLazy(ZodType):
+    def __init__(self, _def: dict):
+        super().__init__(_def)
+        self._schema = None
+
     def _parse(self, input):
         ctx = self._get_or_return_ctx(input)
-        return self.schema._parse(ParseInput(data=ctx.data, path=ctx.path, parent=ctx))
+        if not self._def["memo"]:
+            return self.schema._parse(
+                ParseInput(data=ctx.data, path=ctx.path, parent=ctx)
+            )
+
+        memo = ctx.common.memo
+        if memo is None:
+            memo = ctx.common.memo = {}
+        key = (id(self), id(ctx.data))
+        cached = memo.get(key)
+
+        if cached is _IN_PROGRESS:
+            add_issue_to_context(
+                ctx, code=ZodIssueCode.custom, message="Circular reference detected"
+            )
+            return INVALID
+        elif cached is not None:
+            return cached[1]
+
+        memo[key] = _IN_PROGRESS
+        result = self.schema._parse(
+            ParseInput(data=ctx.data, path=ctx.path, parent=ctx)
+        )
+        if result.status is VALID:
+            # keep a reference to the data so that its id can't be reused
+            memo[key] = (ctx.data, result)
+        else:
+            # issues are reported at each path the data appears
+            del memo[key]
+        return result
+
+    def _compile(self, memo):
+        # compile the inner schema on first use so that recursive schemas terminate
+        resolved = []
+
+        def validate(data, common):
+            if not resolved:
+                resolved.append(_compile_schema(self.schema, memo))
+            return resolved[0](data, common)
+
+        if not self._def["memo"]:
+            return validate
+
+        active = set()
+
+        def validate_acyclic(data, common):
+            key = id(data)
+            if key in active:
+                raise _Fallback
+            active.add(key)
+            try:
+                return validate(data, common)
+            finally:
+                active.discard(key)
+
+        return validate_acyclic
 
     @property
     def schema(self):
-        return self._def["getter"]()
+        if self._schema is None:
+            self._schema = self._def["getter"]()
+        return self._schema
 
     @classmethod
-    def _create(cls, getter, **params):
-        return cls(dict(getter=getter, **process_params(**params)))
+    def _create(cls, getter, memo=False, **params):
+        return cls(dict(getter=getter, memo=memo, **process_params(**params)))
 
 
 class ZodLiteral(ZodType):
@@ -1230,6 +1786,17 @@ class ZodLiteral(ZodType):
             add_issue_to_context(ctx, code=ZodIssueCode.invalid_literal, expected=value)
             return INVALID
 
+    def _compile(self, memo):
+        value = self._def["value"]
+        value_type = type(value)
+
+        def validate(data, common):
+            if data is value or (type(data) is value_type and data == value):
+                return data
+            raise _Invalid
+
+        return validate
+
     @property
     def value(self):
         return self._def["value"]
@@ -1260,6 +1827,154 @@ class CheckContext:
         return self.ctx.path
 
 
+class _CompiledCheckContext:
+    # stands in for CheckContext inside a compiled validator
+    # the issues are kept so that a full parse can replay them
+    def __init__(self):
+        self.failed = False
+        self.issues = []
+
+    def add_issue(self, *args, **issue_data):
+        self.failed = True
+        self.issues.append((args, issue_data))
+
+    def __getattr__(self, name):
+        # paths and parse contexts aren't tracked - so do a full parse instead
+        # a transform that gets here will run again in the full parse
+        raise _Fallback
+
+
+class CompiledSchema:
+    """A schema specialised into a single validator function
+
+    Valid data is parsed without building any intermediate parse state.
+    If the data is invalid, the original schema is used to report the issues,
+    with the same context, so transforms that have already run aren't run again.
+    """
+
+    def __init__(self, schema: ZodType):
+        self.schema = schema
+        self._validate = _compile_schema(schema, {})
+
+    def parse(self, data, **params):
+        result = self.safe_parse(data, **params)
+        if result.success:
+            return result.data
+        raise result.error
+
+    def safe_parse(self, data, **params):
+        ctx = self.schema._root_context(data, params)
+        try:
+            value = self._validate(data, ctx.common)
+        except (_Invalid, _Fallback):
+            result = self.schema._parse(ParseInput(data, ctx.path, ctx))
+            return handle_result(ctx, result)
+        return ParseResult(success=True, data=value, error=None)
+
+    def parse_many(self, iterable, **params):
+        return _data_or_raise(self.safe_parse_many(iterable, **params))
+
+    def safe_parse_many(self, iterable, **params):
+        path = params.get("path", [])
+        for i, item in enumerate(iterable):
+            yield self.safe_parse(item, **{**params, "path": path + [i]})
+
+
+class IncrementalValidator:
+    """Revalidates a typed_dict schema after some of its keys have changed
+
+    The result of each key is kept between calls.
+    Only the changed keys, the unknown keys and any refinements are parsed again.
+    """
+
+    def __init__(self, schema: ZodType, **params):
+        refinements = []
+        inner = schema
+        while type(inner) is ZodEffects and inner._def["effect"]["type"] == "refinment":
+            refinements.append(inner)
+            inner = inner._def["schema"]
+        if type(inner) is not ZodTypedDict:
+            raise TypeError(
+                "validator() expects a typed_dict schema, optionally with refinements"
+            )
+        self.schema = schema
+        self._typed_dict = inner
+        self._refinements = refinements
+        self._params = params
+        self._results = {}
+
+    def reset(self):
+        "forget the previous results - the next call to validate parses every key"
+        self._results = {}
+
+    def validate(self, data, changed=None):
+        """returns a ParseResult for data
+
+        changed should be an iterable of the keys that have changed since the last call.
+        If it is None, every key is parsed.
+        """
+        schema = self._typed_dict
+        ctx = root = self.schema._root_context(data, self._params)
+        common = ctx.common
+        path = ctx.path
+        abort_early = common.abort_early
+
+        # rebuild the contexts each schema in the chain would have created
+        refinement_ctxs = []
+        for refinement in self._refinements:
+            ctx = refinement._get_or_return_ctx(ParseInput(data, path, ctx))
+            refinement_ctxs.append((refinement, ctx))
+
+        input = ParseInput(data, path, ctx)
+        if schema._check_invalid_type(input):
+            self._results = {}
+            return handle_result(root, INVALID)
+
+        status, ctx = schema._process_input_params(input)
+        _, fields, _, _ = schema._get_cached()
+        if changed is None:
+            self._results = {}
+        results = self._results
+        # forget the changed keys first, they stay unparsed if we abort early
+        for key in changed or ():
+            results.pop(key, None)
+
+        pairs = []
+        issues = []
+        for key, key_return, key_validator in fields:
+            if key not in results:
+                common.issues = []
+                value = getitem(data, key, MISSING)
+                result = key_validator._parse(ParseInputLazyPath(ctx, value, path, key))
+                results[key] = (result, common.issues)
+            result, key_issues = results[key]
+            issues.extend(key_issues)
+            if abort_early and result.status is not VALID:
+                common.issues = issues
+                return handle_result(root, INVALID)
+            pairs.append((key_return, result, key in data))
+
+        common.issues = issues
+        if not schema._parse_extra_keys(ctx, status, pairs):
+            return handle_result(root, INVALID)
+        original = None if common.copy_output else data
+        result = ParseStatus.merge_dict(status, pairs, original)
+
+        for refinement, ctx in reversed(refinement_ctxs):
+            if result.status is ABORTED:
+                break
+            if result.status is DIRTY and abort_early:
+                result = INVALID
+                break
+            status = ParseStatus(result.status)
+            refinement._def["effect"]["refinement"](
+                result.value, CheckContext(status, ctx)
+            )
+            result = ParseReturn(status.value, result.value)
+
+        return handle_result(root, result)
+
+
 class ZodEffects(ZodType):
     def _parse(self, input):
         status, ctx = self._process_input_params(input)
@@ -1269,7 +1984,9 @@ class ZodEffects(ZodType):
         effect_type = effect["type"]
 
         if effect_type == "preprocess":
-            processed = effect["transform"](ctx.data)
+            processed = _apply_effect(
+                self, effect["transform"], ctx.data, None, ctx.common
+            )
             return self._def["schema"]._parse(ParseInput(processed, ctx.path, ctx))
 
         if effect_type == "refinment":
@@ -1277,6 +1994,8 @@ class ZodEffects(ZodType):
             if inner.status is ABORTED:
                 return INVALID
             elif inner.status is DIRTY:
+                if ctx.common.abort_early:
+                    return INVALID
                 status.dirty()
             effect["refinement"](inner.value, check_ctx)
             return ParseReturn(status.value, inner.value)
@@ -1286,11 +2005,57 @@ class ZodEffects(ZodType):
             if not is_valid(base):
                 return base
 
-            result = effect["transform"](base.value, check_ctx)
+            result = _apply_effect(
+                self, effect["transform"], base.value, check_ctx, ctx.common
+            )
             return ParseReturn(status.value, result)
 
         assert False, "unnkown effect"
 
+    def _compile(self, memo):
+        inner = _compile_schema(self._def["schema"], memo)
+        effect = self._def["effect"]
+        effect_type = effect["type"]
+
+        if effect_type == "preprocess":
+            preprocess = effect["transform"]
+
+            def validate(data, common):
+                return inner(
+                    _record_effect(self, preprocess, data, None, common), common
+                )
+
+            return validate
+
+        if effect_type == "refinment":
+            refinement = effect["refinement"]
+
+            def validate(data, common):
+                value = inner(data, common)
+                check_ctx = _CompiledCheckContext()
+                refinement(value, check_ctx)
+                if check_ctx.failed:
+                    raise _Invalid
+                return value
+
+            return validate
+
+        if effect_type == "transform":
+            transform = effect["transform"]
+
+            def validate(data, common):
+                check_ctx = _CompiledCheckContext()
+                value = _record_effect(
+                    self, transform, inner(data, common), check_ctx, common
+                )
+                if check_ctx.failed:
+                    raise _Invalid
+                return value
+
+            return validate
+
+        assert False, "unnkown effect"
+
     @classmethod
     def _create(cls, schema, effect, **params):
         return cls(dict(schema=schema, effect=effect, **process_params(**params)))
@@ -1317,6 +2082,17 @@ class ZodWraps(ZodType):
             return OK(self._wraps)
         return self._def["inner_type"]._parse(input)
 
+    def _compile(self, memo):
+        wraps = self._wraps
+        inner = _compile_schema(self._def["inner_type"], memo)
+
+        def validate(data, common):
+            if data is wraps:
+                return wraps
+            return inner(data, common)
+
+        return validate
+
     def unwrap(self):
         return self._def["inner_type"]
 
@@ -1359,6 +2135,17 @@ class ZodDefault(ZodDefaultAbstract):
             ParseInput(data, path=ctx.path, parent=ctx)
         )
 
+    def _compile(self, memo):
+        default = self._def["default"]
+        inner = _compile_schema(self._def["inner_type"], memo)
+
+        def validate(data, common):
+            if data is MISSING:
+                data = default()
+            return inner(data, common)
+
+        return validate
+
 
 class ZodCatch(ZodDefaultAbstract):
     def _parse(self, input):
@@ -1367,6 +2154,18 @@ class ZodCatch(ZodDefaultAbstract):
         value = result.value if result.status is VALID else self._def["default"]()
         return ParseReturn(VALID, value)
 
+    def _compile(self, memo):
+        default = self._def["default"]
+        inner = _compile_schema(self._def["inner_type"], memo)
+
+        def validate(data, common):
+            try:
+                return inner(data, common)
+            except _Invalid:
+                return default()
+
+        return validate
+
 
 class ZodUnion(ZodType):
     def _parse(self, input):
@@ -1377,13 +2176,7 @@ class ZodUnion(ZodType):
 
         for option in options:
             # child_ctx = ...
-            child_ctx = ParseContext(
-                **{
-                    **ctx,
-                    "common": Common(**{**ctx.common, "issues": []}),
-                    "parent": None,
-                }
-            )
+            child_ctx = ctx.copy(common=ctx.common.copy(issues=[]), parent=None)
 
             result = option._parse(
                 ParseInput(data=ctx.data, path=ctx.path, parent=child_ctx)
@@ -1404,6 +2197,19 @@ class ZodUnion(ZodType):
         add_issue_to_context(ctx, code=ZodIssueCode.invalid_union, union_issues=issues)
         return INVALID
 
+    def _compile(self, memo):
+        options = [_compile_schema(option, memo) for option in self._def["options"]]
+
+        def validate(data, common):
+            for option in options:
+                try:
+                    return option(data, common)
+                except _Invalid:
+                    pass
+            raise _Invalid
+
+        return validate
+
     @property
     def options(self):
         return self._def["options"]
@@ -1413,6 +2219,103 @@ class ZodUnion(ZodType):
         return cls(dict(options=types, **process_params(**params)))
 
 
+def _discriminator_values(schema):
+    if type(schema) is ZodLiteral:
+        return [schema.value]
+    if type(schema) is ZodEnum:
+        return schema.options
+    return []
+
+
+def _get_option(options_map, value):
+    try:
+        return options_map.get((type(value), value))
+    except TypeError:
+        # unhashable discriminator values can't match a literal
+        return None
+
+
+class ZodDiscriminatedUnion(ZodType):
+    _type = ZodParsedType.mapping
+    _type_name = _type
+
+    def _parse(self, input):
+        if self._check_invalid_type(input):
+            return INVALID
+
+        discriminator = self._def["discriminator"]
+        value = getitem(input.data, discriminator, MISSING)
+        option = _get_option(self._def["options_map"], value)
+
+        if option is None:
+            ctx = self._get_or_return_ctx(input)
+            add_issue_to_context(
+                ctx,
+                code=ZodIssueCode.invalid_union_discriminator,
+                options=[value for _, value in self._def["options_map"]],
+                path=[discriminator],
+            )
+            return INVALID
+
+        return option._parse(input)
+
+    def _compile(self, memo):
+        discriminator = self._def["discriminator"]
+        options_map = {
+            key: _compile_schema(option, memo)
+            for key, option in self._def["options_map"].items()
+        }
+
+        def validate(data, common):
+            if (
+                type(data) is not dict
+                and get_parsed_type(data) != ZodParsedType.mapping
+            ):
+                raise _Invalid
+            option = _get_option(options_map, getitem(data, discriminator, MISSING))
+            if option is None:
+                raise _Invalid
+            return option(data, common)
+
+        return validate
+
+    @property
+    def discriminator(self):
+        return self._def["discriminator"]
+
+    @property
+    def options(self):
+        return self._def["options"]
+
+    @classmethod
+    def _create(cls, discriminator, options, **params):
+        options = list_(options)
+        options_map = {}
+        for option in options:
+            if type(option) is not ZodTypedDict:
+                raise TypeError(
+                    "discriminated_union options must be typed_dict schemas"
+                )
+            values = _discriminator_values(option.shape.get(discriminator))
+            if not values:
+                raise TypeError(
+                    f"discriminator {discriminator!r} must be a literal or enum in every option"
+                )
+            for value in values:
+                key = (type(value), value)
+                if key in options_map:
+                    raise ValueError(f"duplicate discriminator value {value!r}")
+                options_map[key] = option
+        return cls(
+            dict(
+                discriminator=discriminator,
+                options=options,
+                options_map=options_map,
+                **process_params(**params),
+            )
+        )
+
+
 class ZodPipeline(ZodType):
     def _parse(self, input):
         status, ctx = self._process_input_params(input)
@@ -1428,6 +2331,11 @@ class ZodPipeline(ZodType):
             ParseInput(data=in_result.value, path=ctx.path, parent=ctx)
         )
 
+    def _compile(self, memo):
+        in_ = _compile_schema(self._def["in"], memo)
+        out = _compile_schema(self._def["out"], memo)
+        return lambda data, common: out(in_(data, common), common)
+
     @classmethod
     def _create(cls, a: ZodType, b: ZodType, **params):
         return cls(dict({"in": a, "out": b}, **process_params(**params)))
@@ -1456,6 +2364,7 @@ array = ZodList._create
 boolean = ZodBoolean._create
 date = ZodDate._create
 datetime = ZodDateTime._create
+discriminated_union = ZodDiscriminatedUnion._create
 enum = ZodEnum._create
 float = ZodFloat._create
 integer = ZodInteger._create
@@ -17,7 +17,7 @@ class ZodIssueCode_:
     invalid_literal = "invalid_literal"
     custom = "custom"
     invalid_union = "invalid_union"
-    # "invalid_union_discriminator"
+    invalid_union_discriminator = "invalid_union_discriminator"
     invalid_enum_value = "invalid_enum_value"
     unrecognized_keys = "unrecognized_keys"
     # "invalid_arguments",
@@ -63,12 +63,53 @@ def _mapper(issue):
     return issue.get("message", "unknown")
 
 
+class _LazyMessage:
+    "Stands in for the message in an error's args until it is first used"
+
+    def __init__(self, error):
+        self._error = error
+
+    def __str__(self):
+        return self._error.message
+
+    def __repr__(self):
+        return repr(self._error.message)
+
+    def __eq__(self, other):
+        if isinstance(other, _LazyMessage):
+            other = str(other)
+        return self._error.message == other
+
+    def __hash__(self):
+        return hash(self._error.message)
+
+    def __getattr__(self, name):
+        return getattr(self._error.message, name)
+
+
 class ZodError(anvil.server.AnvilWrappedError):
     def __init__(self, issues):
         self.issues = issues
         self._formatted = None
-        self.message = "; ".join(map(_join_messages, issues))
-        Exception.__init__(self, self.message)
+        self._message = None
+        Exception.__init__(self, _LazyMessage(self))
+
+    @property
+    def message(self):
+        # issue messages are only rendered when they're needed
+        if self._message is None:
+            self._message = "; ".join(map(_join_messages, self.issues))
+        return self._message
+
+    @message.setter
+    def message(self, value):
+        self._message = value
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.message!r})"
 
     def format(self):
         if self._formatted is not None:
@@ -41,3 +41,47 @@ class DictLike:
 
     def __str__(self):
         return str(self.__dict__)
+
+
+class SlotsDictLike:
+    """A compact alternative to DictLike for objects with a fixed set of attributes
+
+    Subclasses declare their attributes in __slots__.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, val):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, val)
+
+    def keys(self):
+        return self.__slots__
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def get(self, key, default=None):
+        if key in self.__slots__:
+            return getattr(self, key)
+        return default
+
+    def copy(self, **changes):
+        "returns a shallow copy with the changes applied"
+        new = object.__new__(type(self))
+        for key in self.__slots__:
+            setattr(new, key, changes[key] if key in changes else getattr(self, key))
+        return new
+
+    def __repr__(self):
+        items = ((k, getattr(self, k)) for k in self.__slots__)
+        return f"{type(self).__name__}({', '.join(f'{k}={v!r}' for k, v in items)})"
+
+    def __str__(self):
+        return str({k: getattr(self, k) for k in self.__slots__})
@@ -0,0 +1,56 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (c) 2021 The Anvil Extras project team members listed at
+# https://github.com/anvilistas/anvil-extras/graphs/contributors
+#
+# This software is published at https://github.com/anvilistas/anvil-extras
+
+__version__ = "3.6.3"
+
+# set in each worker process by _init_worker
+_parse_shard = None
+
+
+def _init_worker(parse_shard):
+    global _parse_shard
+    _parse_shard = parse_shard
+
+
+def _run_shard(bounds):
+    return _parse_shard(*bounds)
+
+
+def get_fork_context():
+    import multiprocessing
+
+    try:
+        return multiprocessing.get_context("fork")
+    except ValueError:
+        return None
+
+
+def map_shards(parse_shard, size, chunk_size, workers=None):
+    """Call parse_shard(start, stop) for each chunk of range(size) in a process pool
+
+    The workers are forked, so parse_shard (along with the schema and data it
+    refers to) is inherited rather than pickled. Only the chunk bounds and the
+    return values are sent between processes.
+
+    Returns the results in order, or None if processes can't be forked.
+    """
+    mp_context = get_fork_context()
+    if mp_context is None:
+        return None
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    bounds = [
+        (start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)
+    ]
+    with ProcessPoolExecutor(
+        workers,
+        mp_context=mp_context,
+        initializer=_init_worker,
+        initargs=(parse_shard,),
+    ) as pool:
+        return list(pool.map(_run_shard, bounds))
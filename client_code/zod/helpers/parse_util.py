@@ -7,8 +7,9 @@
 
 __version__ = "3.6.3"
 
-from ..errors import get_default_error_map, get_error_map
-from .dict_util import DictLike
+from .. import errors as _errors
+from ..errors import get_default_error_map
+from .dict_util import SlotsDictLike
 
 VALID = "valid"
 DIRTY = "dirty"
@@ -22,17 +23,37 @@ class _MissingType:
     def __repr__(self):
         return "<zod.MISSING>"
 
+    def __reduce__(self):
+        # unpickle as the MISSING singleton
+        return "MISSING"
+
 
 MISSING = _MissingType()
 
 
-class Common(DictLike):
-    def __init__(self, issues, contextual_error_map):
+class Common(SlotsDictLike):
+    __slots__ = ("issues", "contextual_error_map", "abort_early", "copy_output", "memo")
+
+    def __init__(
+        self,
+        issues,
+        contextual_error_map,
+        abort_early=False,
+        copy_output=True,
+        memo=None,
+    ):
         self.issues = issues
         self.contextual_error_map = contextual_error_map
+        self.abort_early = abort_early
+        # when False, unchanged lists and dicts are returned rather than copied
+        self.copy_output = copy_output
+        # results of memoised lazy schemas - created on first use
+        self.memo = memo
 
 
-class ParseContext(DictLike):
+class ParseContext(SlotsDictLike):
+    __slots__ = ("common", "path", "schema_error_map", "parent", "data", "parsed_type")
+
     def __init__(
         self, common: Common, path, schema_error_map, parent, data, parsed_type
     ):
@@ -44,20 +65,26 @@ class ParseContext(DictLike):
         self.parsed_type = parsed_type
 
 
-class ParseInput(DictLike):
+class ParseInput(SlotsDictLike):
+    __slots__ = ("data", "path", "parent")
+
     def __init__(self, data, path, parent):
         self.data = data
         self.path = path
         self.parent = parent
 
 
-class ParseReturn(DictLike):
+class ParseReturn(SlotsDictLike):
+    __slots__ = ("status", "value")
+
     def __init__(self, status, value):
         self.status = status
         self.value = value
 
 
-class ParseResult(DictLike):
+class ParseResult(SlotsDictLike):
+    __slots__ = ("success", "data", "error")
+
     def __init__(self, success, data, error):
         self.success = success
         self.data = data
@@ -69,6 +96,8 @@ class ParseResult(DictLike):
 
 
 class ParseStatus:
+    __slots__ = ("value",)
+
     def __init__(self, value=VALID):
         self.value = value
 
@@ -81,7 +110,8 @@ class ParseStatus:
             self.value = ABORTED
 
     @staticmethod
-    def merge_list(status, results):
+    def merge_list(status, results, original=None):
+        "if original is given and every value is unchanged, the original list is returned"
         list_value = []
         for s in results:
             if s.status == ABORTED:
@@ -90,10 +120,18 @@ class ParseStatus:
                 status.dirty()
             list_value.append(s.value)
 
+        if (
+            type(original) is list
+            and len(original) == len(list_value)
+            and all(a is b for a, b in zip(original, list_value))
+        ):
+            return ParseReturn(status.value, original)
+
         return ParseReturn(status.value, list_value)
 
     @staticmethod
-    def merge_dict(status, pairs):
+    def merge_dict(status, pairs, original=None):
+        "if original is given and every key and value is unchanged, the original dict is returned"
         final = {}
         for key, value, always_set in pairs:
             if key.status == ABORTED or value.status == ABORTED:
@@ -104,55 +142,151 @@ class ParseStatus:
             if value.value is not MISSING or always_set:
                 final[key.value] = value.value
 
+        if (
+            type(original) is dict
+            and len(original) == len(final)
+            and all(original.get(k, MISSING) is v for k, v in final.items())
+        ):
+            return ParseReturn(status.value, original)
+
         return ParseReturn(status.value, final)
 
 
 INVALID = ParseReturn(ABORTED, None)
 
 
-class ErrorMapContext(DictLike):
+class ErrorMapContext(SlotsDictLike):
+    __slots__ = ("data", "default_error")
+
     def __init__(self, data, default_error):
         self.data = data
         self.default_error = default_error
 
 
-class ParseIssue(DictLike):
-    def __init__(self, message="", path=None, **issue_data):
-        self.message = message
-        self.path = path or []
-        self.__dict__.update(**issue_data)
-
-
-def make_issue(issue_data, data, path, error_maps):
-    full_path = path + issue_data.get("path", [])
-    full_issue = ParseIssue(**{**issue_data, "path": full_path})
-
-    if not full_issue["message"]:
+class ParseIssue:
+    """An issue with the raw issue data from a parse
+
+    The full path and the message are only computed when first accessed.
+    Issues inside a union option are often discarded without being read.
+    The error maps are those active when the issue was created,
+    but they are passed the data as it is when the message is rendered.
+    """
+
+    def __init__(self, issue_data, data, path, error_maps):
+        self._issue_data = issue_data
+        self._data = data
+        self._base_path = path
+        self._error_maps = error_maps
+        self._path = None
+        self._message = None
+
+    @property
+    def path(self):
+        if self._path is None:
+            self._path = self._base_path + self._issue_data.get("path", [])
+        return self._path
+
+    @path.setter
+    def path(self, val):
+        self._path = val
+
+    @property
+    def message(self):
+        if self._message is None:
+            self._message = self._issue_data.get("message") or ""
+            if not self._message:
+                self._message = self._map_message()
+        return self._message
+
+    @message.setter
+    def message(self, val):
+        self._message = val
+
+    def _map_message(self):
+        contextual_error_map, schema_error_map, global_error_map = self._error_maps
+        default_error_map = get_default_error_map()
+        error_maps = [
+            m
+            for m in (
+                contextual_error_map,
+                schema_error_map,
+                global_error_map or default_error_map,
+                default_error_map,
+            )
+            if m
+        ]
         error_message = ""
-        for error_map in reversed(list(filter(None, error_maps))):
+        for error_map in reversed(error_maps):
             error_message = error_map(
-                full_issue, ErrorMapContext(data=data, default_error=error_message)
+                self, ErrorMapContext(data=self._data, default_error=error_message)
             )["message"]
-        full_issue["message"] = error_message
+        return error_message
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self._issue_data[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __getitem__(self, key):
+        if key == "message":
+            return self.message
+        if key == "path":
+            return self.path
+        return self._issue_data[key]
+
+    def __setitem__(self, key, val):
+        if key == "message":
+            self._message = val
+        elif key == "path":
+            self._path = val
+        else:
+            self._issue_data[key] = val
+
+    def keys(self):
+        return ["message", "path", *(k for k in self._issue_data if k != "path")]
+
+    def __contains__(self, key):
+        return key in ("message", "path") or key in self._issue_data
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def __getstate__(self):
+        # render before pickling, the data and error maps may not be picklable
+        return {
+            **self.__dict__,
+            "_message": self.message,
+            "_path": self.path,
+            "_data": None,
+            "_error_maps": (None, None, None),
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
 
-    return full_issue
+    def __repr__(self):
+        items = ((k, self[k]) for k in self.keys())
+        return f"ParseIssue({', '.join(f'{k}={v!r}' for k, v in items)})"
+
+    def __str__(self):
+        return str({k: self[k] for k in self.keys()})
 
 
 def add_issue_to_context(ctx: ParseContext, **issue_data):
-    issue = make_issue(
+    issue = ParseIssue(
         issue_data=issue_data,
         data=ctx.data,
         path=ctx.path,
-        error_maps=[
-            m
-            for m in (
-                ctx.common.contextual_error_map,
-                ctx.schema_error_map,
-                get_error_map(),
-                get_default_error_map(),
-            )
-            if m
-        ],
+        error_maps=(
+            ctx.common.contextual_error_map,
+            ctx.schema_error_map,
+            _errors.error_map,
+        ),
     )
     ctx.common.issues.append(issue)
 
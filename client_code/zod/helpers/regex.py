@@ -25,19 +25,42 @@ _raw = {
 }
 
 _cache = {}
+# user patterns - a plain dict keeps insertion order so the first key is the oldest
+_compiled = {}
+_MAX_COMPILED = 256
 
 
 def __getattr__(name):
     if name not in __all__:
         raise AttributeError(name)
 
-    # do this lazily on the client
-    import re
+    rv = _cache.get(name)
+    if rv is None:
+        # do this lazily on the client
+        import re
 
-    _cache[name] = re.compile(_raw[name], re.IGNORECASE)
+        rv = _cache[name] = re.compile(_raw[name], re.IGNORECASE)
 
-    return _cache[name]
+    return rv
 
 
 def __dir__(self):
     return __all__
+
+
+def compile(pattern, flags=0):
+    "compile a pattern, reusing the compiled version of recently used patterns"
+    if not isinstance(pattern, str):
+        # already compiled
+        return pattern
+
+    key = (pattern, flags)
+    rv = _compiled.pop(key, None)
+    if rv is None:
+        import re
+
+        rv = re.compile(pattern, flags)
+        if len(_compiled) >= _MAX_COMPILED:
+            del _compiled[next(iter(_compiled))]
+    _compiled[key] = rv
+    return rv
@@ -33,8 +33,8 @@ def error_map(issue, _ctx: ErrorMapContext):
     elif code == ZodIssueCode.invalid_union:
         message = "Invalid input"
 
-    # elif code == ZodIssueCode.invalid_union_discriminator:
-    #     message = f"Invalid discriminator value. Expected {join(issue['options'])}"
+    elif code == ZodIssueCode.invalid_union_discriminator:
+        message = f"Invalid discriminator value. Expected {join(issue['options'])}"
 
     elif code == ZodIssueCode.invalid_enum_value:
         message = f"Invalid enum value. Expected {join(issue['options'])}, received {issue['received']!r}"
@@ -5,21 +5,63 @@
 #
 # This software is published at https://github.com/anvilistas/anvil-extras
 import functools
+import threading
+from contextlib import contextmanager
 from operator import itemgetter
+from time import monotonic, perf_counter
 
 import anvil.users
 from anvil.tables import app_tables
+from anvil.tables import query as q
 
 __version__ = "3.6.3"
 
-config = {"get_roles": itemgetter("roles")}
+config = {
+    "get_roles": itemgetter("roles"),
+    # the table of each user's roles, if get_roles is a table name
+    "user_roles_table": None,
+    "roles_table": "roles",
+    "cache_ttl": None,
+    "cache_size": 10000,
+    "index_roles": False,
+    "metrics": False,
+}
 
 sentinel = object()
 
+# user id -> (expiry time, permissions) - only used if config["cache_ttl"] is set
+# entries are in order of expiry, and there are at most config["cache_size"]
+_cache = {}
+_cache_lock = threading.Lock()
+# holds the permissions cache for the server call in progress on each thread
+_local = threading.local()
+# role id -> frozenset of permission names - only used if config["index_roles"] is set
+_role_index = None
+_role_index_lock = threading.Lock()
+# only updated if config["metrics"] is set - see get_metrics
+_metrics = {"functions": {}, "cache_hits": 0, "cache_misses": 0}
+_metrics_lock = threading.Lock()
+
 
 def set_config(**kwargs):
     if "get_roles" in kwargs:
         _set_user_roles_getter(kwargs["get_roles"])
+        invalidate()
+    if "cache_ttl" in kwargs:
+        config["cache_ttl"] = kwargs["cache_ttl"]
+        invalidate()
+    if "cache_size" in kwargs:
+        config["cache_size"] = kwargs["cache_size"]
+        with _cache_lock:
+            _prune_cache(monotonic())
+    if "roles_table" in kwargs:
+        config["roles_table"] = kwargs["roles_table"]
+    if "index_roles" in kwargs:
+        config["index_roles"] = bool(kwargs["index_roles"])
+    if "roles_table" in kwargs or "index_roles" in kwargs:
+        refresh_role_index(load=False)
+    if "metrics" in kwargs:
+        config["metrics"] = bool(kwargs["metrics"])
 
 
 def _get_roles_from_table(table_name, user):
@@ -29,25 +71,290 @@ def _get_roles_from_table(table_name, user):
 def _set_user_roles_getter(option):
     if option is None:
         config["get_roles"] = itemgetter("roles")
+        config["user_roles_table"] = None
     elif isinstance(option, str):  # table name
         config["get_roles"] = functools.partial(_get_roles_from_table, option)
+        config["user_roles_table"] = option
     else:
         raise TypeError("get_roles: option is not valid.")
 
 
-def authentication_required(func):
-    """A decorator to ensure only a valid user can call a server function"""
+@contextmanager
+def _call_scope():
+    """Cache each user's permissions until the outermost scope exits
+
+    Used by authorisation_required, so that stacked decorators and any checks within
+    the server function share a single lookup of the user's roles.
+    """
+    if getattr(_local, "cache", None) is not None:
+        yield
+        return
+    _local.cache = {}
+    try:
+        yield
+    finally:
+        _local.cache = None
+
+
+def _user_key(user):
+    "The key for a user's cached permissions, or None if they can't be cached"
+    get_id = getattr(user, "get_id", None)
+    return None if get_id is None else get_id()
+
+
+def invalidate(user=None):
+    """Clear the cached permissions of a user, or of all users if user is None
+
+    Call this after changing a user's roles or a role's permissions.
+    """
+    call_cache = getattr(_local, "cache", None)
+    if user is None:
+        with _cache_lock:
+            _cache.clear()
+        if call_cache is not None:
+            call_cache.clear()
+        return
+    key = _user_key(user)
+    if key is None:
+        return
+    with _cache_lock:
+        _cache.pop(key, None)
+    if call_cache is not None:
+        call_cache.pop(key, None)
+
+
+def _role_permissions(role):
+    return frozenset(permission["name"] for permission in role["permissions"])
+
+
+def refresh_role_index(load=True):
+    """Rebuild the index of role to permission names used when index_roles is set
+
+    Call this after changing the roles or permissions tables.
+    The index is loaded with a single search of config["roles_table"]. If load is
+    False, it is loaded on first use instead.
+    Cached permissions are only cleared if a previous index has changed.
+
+    Returns the new index, or None if it wasn't loaded.
+    """
+    global _role_index
+    with _role_index_lock:
+        previous = _role_index
+        index = None
+        if load and config["index_roles"]:
+            roles = getattr(app_tables, config["roles_table"]).search(
+                q.fetch_only("name", permissions=q.fetch_only("name"))
+            )
+            index = {role.get_id(): _role_permissions(role) for role in roles}
+        _role_index = index
+    # permissions found before the first load were read from the tables themselves
+    if previous is not None and index != previous:
+        invalidate()
+    return index
+
+
+def _get_role_index():
+    index = _role_index
+    if index is None:
+        index = refresh_role_index()
+    return index
+
+
+def _permissions_from_roles(roles, role_cache=None):
+    """Returns a frozenset of the permission names of the roles
+
+    role_cache maps role ids to permission names for roles already read in a batch.
+    """
+    if config["index_roles"]:
+        role_cache = _get_role_index()
+    permissions = set()
+    for role in roles:
+        if role_cache is None:
+            permissions.update(_role_permissions(role))
+            continue
+        key = role.get_id()
+        role_permissions = role_cache.get(key)
+        if role_permissions is None:
+            # not in the batch yet, or a role added since the index was built
+            role_permissions = _role_permissions(role)
+            if not config["index_roles"]:
+                role_cache[key] = role_permissions
+        permissions.update(role_permissions)
+    return frozenset(permissions)
+
+
+def _get_roles(user):
+    try:
+        return config["get_roles"](user)
+    except TypeError:
+        return None
+
+
+def _load_permissions(user):
+    try:
+        return _permissions_from_roles(_get_roles(user))
+    except TypeError:
+        return None
+
+
+_MISSING = object()
+
+
+def _cached_permissions(key):
+    call_cache = getattr(_local, "cache", None)
+    if call_cache is not None and key in call_cache:
+        permissions = call_cache[key]
+    else:
+        entry = _cache.get(key) if config["cache_ttl"] else None
+        if entry is not None and entry[0] > monotonic():
+            permissions = entry[1]
+            if call_cache is not None:
+                call_cache[key] = permissions
+        else:
+            permissions = _MISSING
+    if config["metrics"]:
+        _count_cache(hit=permissions is not _MISSING)
+    return permissions
+
+
+def _prune_cache(now):
+    """Remove the expired entries, then the oldest until the cache is within its size
+
+    Call with _cache_lock held.
+    """
+    size = config["cache_size"]
+    while _cache:
+        key = next(iter(_cache))
+        if _cache[key][0] > now and len(_cache) <= size:
+            break
+        del _cache[key]
+
+
+def _cache_permissions(key, permissions):
+    ttl = config["cache_ttl"]
+    if ttl:
+        now = monotonic()
+        with _cache_lock:
+            # moved to the end, so that the entries stay in order of expiry
+            _cache.pop(key, None)
+            _cache[key] = (now + ttl, permissions)
+            _prune_cache(now)
+    call_cache = getattr(_local, "cache", None)
+    if call_cache is not None:
+        call_cache[key] = permissions
+
+
+def _user_permissions(user):
+    """Returns a frozenset of the user's permission names
+
+    Returns None if the user's roles can't be read.
+    """
+    key = _user_key(user)
+    if key is None:
+        return _load_permissions(user)
+    permissions = _cached_permissions(key)
+    if permissions is _MISSING:
+        permissions = _load_permissions(user)
+        _cache_permissions(key, permissions)
+    return permissions
+
+
+def _bulk_get_roles(users):
+    """Returns a list with the roles of each user, or None if they can't be read
+
+    If the roles are in a separate table, they are read with a single search.
+    """
+    user_roles_table = config["user_roles_table"]
+    if user_roles_table is None:
+        return [_get_roles(user) for user in users]
+
+    keys = [_user_key(user) for user in users]
+    rows_users = [user for user, key in zip(users, keys) if key is not None]
+    if not rows_users:
+        return [_get_roles(user) for user in users]
+    rows = getattr(app_tables, user_roles_table).search(user=q.any_of(*rows_users))
+    roles = {row["user"].get_id(): row["roles"] for row in rows if row["user"]}
+    return [
+        _get_roles(user) if key is None else roles.get(key)
+        for user, key in zip(users, keys)
+    ]
+
+
+def get_metrics():
+    """Returns the metrics collected since they were last reset
+
+    Only collected if set_config(metrics=True) has been called. Each decorated
+    function's name maps to the number of checks, the number that were denied and
+    the total seconds spent checking.
+    """
+    with _metrics_lock:
+        return {
+            "functions": {
+                name: dict(stats) for name, stats in _metrics["functions"].items()
+            },
+            "cache_hits": _metrics["cache_hits"],
+            "cache_misses": _metrics["cache_misses"],
+        }
+
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics["functions"] = {}
+        _metrics["cache_hits"] = 0
+        _metrics["cache_misses"] = 0
+
+
+def _count_cache(hit):
+    with _metrics_lock:
+        _metrics["cache_hits" if hit else "cache_misses"] += 1
+
+
+def _record_check(name, elapsed, allowed):
+    with _metrics_lock:
+        stats = _metrics["functions"].get(name)
+        if stats is None:
+            stats = _metrics["functions"][name] = {"calls": 0, "denied": 0, "time": 0}
+        stats["calls"] += 1
+        stats["time"] += elapsed
+        if not allowed:
+            stats["denied"] += 1
+
+
+def _checked(func, check):
+    """Wrap func so that check is called first
+
+    check should raise a ValueError to deny the call.
+    """
+    name = f"{func.__module__}.{func.__qualname__}"
 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        if anvil.users.get_user() is None:
-            raise ValueError("Authentication required")
-        else:
+        with _call_scope():
+            if not config["metrics"]:
+                check()
+                return func(*args, **kwargs)
+            start = perf_counter()
+            try:
+                check()
+            except ValueError:
+                _record_check(name, perf_counter() - start, allowed=False)
+                raise
+            _record_check(name, perf_counter() - start, allowed=True)
             return func(*args, **kwargs)
 
     return wrapper
 
 
+def _check_authenticated():
+    if anvil.users.get_user() is None:
+        raise ValueError("Authentication required")
+
+
+def authentication_required(func):
+    """A decorator to ensure only a valid user can call a server function"""
+    return _checked(func, _check_authenticated)
+
+
 def has_permission(permissions, user=sentinel):
     """Returns True/False depending on whether a user has permission or not"""
     user = anvil.users.get_user() if user is sentinel else user
@@ -60,13 +367,8 @@ def has_permission(permissions, user=sentinel):
     else:
         required_permissions = set(permissions)
 
-    try:
-        user_permissions = set(
-            permission["name"]
-            for role in config["get_roles"](user)
-            for permission in role["permissions"]
-        )
-    except TypeError:
+    user_permissions = _user_permissions(user)
+    if user_permissions is None:
         return False
 
     return required_permissions.issubset(user_permissions)
@@ -88,11 +390,56 @@ def authorisation_required(permissions):
     """A decorator to ensure a user has sufficient permissions to call a server function"""
 
     def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            check_permissions(permissions)
-            return func(*args, **kwargs)
-
-        return wrapper
+        return _checked(func, functools.partial(check_permissions, permissions))
 
     return decorator
+
+
+def permissions_for(users):
+    """Returns a list with a frozenset of the permission names of each user
+
+    The roles of the users are read in bulk, so this is much faster than calling
+    has_permission for each user.
+    """
+    users = list(users)
+    keys = [_user_key(user) for user in users]
+    rv = [frozenset()] * len(users)
+    missing = []
+    for i, (user, key) in enumerate(zip(users, keys)):
+        if user is None:
+            continue
+        permissions = _MISSING if key is None else _cached_permissions(key)
+        if permissions is _MISSING:
+            missing.append(i)
+        elif permissions is not None:
+            rv[i] = permissions
+
+    role_cache = {}
+    all_roles = _bulk_get_roles([users[i] for i in missing])
+    for i, roles in zip(missing, all_roles):
+        try:
+            permissions = _permissions_from_roles(roles, role_cache)
+        except TypeError:
+            permissions = None
+        if keys[i] is not None:
+            _cache_permissions(keys[i], permissions)
+        if permissions is not None:
+            rv[i] = permissions
+    return rv
+
+
+def filter_authorised(users, permissions):
+    """Returns a list of the users that have all the permissions
+
+    permissions should be a string or iterable of strings
+    """
+    if isinstance(permissions, str):
+        required_permissions = set([permissions])
+    else:
+        required_permissions = set(permissions)
+    users = list(users)
+    return [
+        user
+        for user, user_permissions in zip(users, permissions_for(users))
+        if user is not None and required_permissions.issubset(user_permissions)
+    ]
@@ -5,6 +5,10 @@
 #
 # This software is published at https://github.com/anvilistas/anvil-extras
 
+from collections import deque
+from itertools import islice
+from time import monotonic
+
 from anvil.tables import app_tables
 
 from . import lazy_module_loader as lazy
@@ -14,6 +18,9 @@ __version__ = "3.6.3"
 LINKED_COLUMN_TYPES = ("liveObject", "liveObjectArray", "link_single", "link_multiple")
 LO, LOA, LS, LM = LINKED_COLUMN_TYPES
 FIELD_TYPES = None
+# Seconds before cached column metadata and schemas are rebuilt - None to keep them
+CACHE_TTL = None
+_cache = {}
 
 
 def _get_field_types():
@@ -24,7 +31,8 @@ def _get_field_types():
             "bool": mm.fields.Boolean,
             "date": mm.fields.Raw,
             "datetime": mm.fields.Raw,
-            "number": mm.fields.Number,
+            # Number is abstract in marshmallow 4, Float dumps the same in 3
+            "number": mm.fields.Float,
             "string": mm.fields.Str,
             "simpleObject": mm.fields.Raw,
             "media": mm.fields.Raw,
@@ -32,6 +40,134 @@ def _get_field_types():
     return FIELD_TYPES
 
 
+# Conversions applied by the compiled serialiser - None means the value is used as is
+# These match the marshmallow fields in FIELD_TYPES, e.g. Float dumps a float
+CONVERTERS = {
+    "bool": bool,
+    "date": None,
+    "datetime": None,
+    "number": float,
+    "string": str,
+    "simpleObject": None,
+    "media": None,
+}
+
+
+def _freeze(value):
+    """Convert the arguments that define a schema to a hashable cache key
+
+    Lists and tuples are equivalent, as are dicts with the same items in any order.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    elif isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _cached(key, build):
+    """Return the cached value for key, calling build to create it if necessary
+
+    Parameters
+    ----------
+    key : hashable
+    build : function
+        with no arguments, returning the value to cache
+
+    Returns
+    -------
+    the value returned by build
+    """
+    now = monotonic()
+    entry = _cache.get(key)
+    if entry is not None and (entry[0] is None or entry[0] > now):
+        return entry[1]
+    value = build()
+    _cache[key] = (None if CACHE_TTL is None else now + CACHE_TTL, value)
+    return value
+
+
+def invalidate():
+    """Clear the cached column metadata and schemas
+
+    Call this after changing the columns of a data table.
+    """
+    _cache.clear()
+
+
+def _chunks(iterable, chunk_size):
+    """Lazily split an iterable into lists
+
+    Parameters
+    ----------
+    iterable : iterable
+    chunk_size : int
+        the maximum length of each list
+
+    Returns
+    -------
+    generator
+        of lists
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class ChunkError(Exception):
+    """Raised when a chunk of rows serialised in a worker thread fails
+
+    The index of the chunk is available as the index attribute and the original
+    exception as __cause__.
+    """
+
+    def __init__(self, index, error):
+        super().__init__(f"chunk {index} failed to serialise: {error!r}")
+        self.index = index
+
+
+def _map_threaded(fn, chunks, workers):
+    """Lazily apply fn to each chunk in a pool of threads, preserving order
+
+    At most two chunks per worker are in flight, so memory stays bounded for a
+    long iterable of chunks.
+
+    Parameters
+    ----------
+    fn : function
+        taking a chunk
+    chunks : iterable
+    workers : int
+        the number of threads
+
+    Returns
+    -------
+    generator
+        of the results of fn
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    def result(index, future):
+        try:
+            return future.result()
+        except Exception as e:
+            raise ChunkError(index, e) from e
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for index, chunk in enumerate(chunks):
+            pending.append((index, executor.submit(fn, chunk)))
+            if len(pending) >= 2 * workers:
+                yield result(*pending.popleft())
+        while pending:
+            yield result(*pending.popleft())
+
+
 def _exclusions(table_name, ignore_columns):
     """Generate a list of columns to exclude from serialisation for a given table name
 
@@ -180,7 +316,264 @@ def _schema_definition(table_name, columns, ignore_columns, linked_tables, with_
     return result
 
 
-# The following functions hit the data tables service and thus have no tests.
+def _copy_serialised(value):
+    if type(value) is dict:
+        return {k: _copy_serialised(v) for k, v in value.items()}
+    elif type(value) is list:
+        return [_copy_serialised(v) for v in value]
+    return value
+
+
+def _nested(table_name, serialise):
+    """Wrap the serialiser for a linked table so that each linked row is only
+    serialised once for a given memo
+
+    Anvil fetches a linked row when one of its columns is first read. There is no
+    query for a list of rows by id, so each linked row is still fetched on its own.
+    Serialising from the memo means each distinct linked row in a batch is only
+    fetched once, rather than once for every row that links to it.
+    Every reference gets its own copy of the serialised row.
+    """
+
+    def serialise_link(row, memo):
+        if row is None:
+            return None
+        get_id = getattr(row, "get_id", None)
+        if memo is None or get_id is None:
+            return serialise(row, memo)
+        key = (table_name, get_id())
+        rv = memo.get(key)
+        if rv is None:
+            rv = memo[key] = serialise(row, memo)
+            return rv
+        return _copy_serialised(rv)
+
+    return serialise_link
+
+
+def _nested_list(table_name, serialise):
+    serialise_link = _nested(table_name, serialise)
+
+    def serialise_links(rows, memo):
+        if rows is None:
+            return None
+        return [serialise_link(row, memo) for row in rows]
+
+    return serialise_links
+
+
+def _serialiser_fields(table_name, columns, ignore_columns, linked_tables, with_id):
+    """Generate the columns of a table to include in its serialised output
+
+    Parameters
+    ----------
+    table_name : str
+        The name of a data table within the app
+    columns : dict
+        mapping table names to column lists as generated by _columns
+    ignore_columns :  list, tuple, dict or str
+        A list or tuple of column names to ignore, a dict mapping
+        table names to such lists or tuples, or a string with a single column name
+    linked_tables : dict
+        mapping a table name to a dict which, in turn, maps a column name to a linked
+        table name
+    with_id : boolean
+        whether the internal anvil id should be included in the serialised output
+
+    Returns
+    -------
+    tuple
+        of two lists. The first has a (name, convert) pair for each data column,
+        where convert is None or a function to apply to the value. The second has a
+        (name, serialise_link) pair for each linked column, where serialise_link
+        takes the linked value and a memo dict.
+    """
+    exclusions = _exclusions(table_name, ignore_columns)
+    fields = []
+    for column in columns[table_name]:
+        name, column_type = column["name"], column["type"]
+        if column_type in LINKED_COLUMN_TYPES or name in exclusions:
+            continue
+        try:
+            fields.append((name, CONVERTERS[column_type]))
+        except KeyError as e:
+            raise ValueError(f"{e} columns are not supported")
+
+    links = []
+    if table_name in linked_tables:
+        link_columns = _link_columns(columns[table_name])
+        for column, linked_table in linked_tables[table_name].items():
+            if column in link_columns[LS]:
+                wrapper = _nested
+            elif column in link_columns[LM]:
+                wrapper = _nested_list
+            else:
+                continue
+            serialise = _serialiser(
+                linked_table, columns, ignore_columns, linked_tables, with_id
+            )
+            links.append((column, wrapper(linked_table, serialise)))
+
+    return fields, links
+
+
+def _serialiser(table_name, columns, ignore_columns, linked_tables, with_id):
+    """A recursive function to generate a function that serialises a single row
+
+    The function produces the same dict as dumping the row with the schema
+    generated by _schema_definition.
+
+    Parameters
+    ----------
+    table_name : str
+        The name of a data table within the app
+    columns : dict
+        mapping table names to column lists as generated by _columns
+    ignore_columns :  list, tuple, dict or str
+        A list or tuple of column names to ignore, a dict mapping
+        table names to such lists or tuples, or a string with a single column name
+    linked_tables : dict
+        mapping a table name to a dict which, in turn, maps a column name to a linked
+        table name
+    with_id : boolean
+        whether the internal anvil id should be included in the serialised output
+
+    Returns
+    -------
+    function
+        taking a row and an optional memo dict and returning a dict.
+        Linked rows are serialised once per memo.
+    """
+    fields, links = _serialiser_fields(
+        table_name, columns, ignore_columns, linked_tables, with_id
+    )
+
+    def serialise(row, memo=None):
+        result = {}
+        for name, convert in fields:
+            try:
+                value = row[name]
+            except KeyError:
+                continue
+            if convert is not None and value is not None:
+                value = convert(value)
+            result[name] = value
+        for name, serialise_link in links:
+            try:
+                value = row[name]
+            except KeyError:
+                continue
+            result[name] = serialise_link(value, memo)
+        if with_id:
+            result["_id"] = row.get_id()
+        return result
+
+    return serialise
+
+
+def _values_serialiser(table_name, columns, ignore_columns, linked_tables, with_id):
+    """Generate a function that serialises a single row to a list of values
+
+    Linked rows within the values are serialised to dicts.
+
+    Parameters
+    ----------
+    table_name : str
+        The name of a data table within the app
+    columns : dict
+        mapping table names to column lists as generated by _columns
+    ignore_columns :  list, tuple, dict or str
+        A list or tuple of column names to ignore, a dict mapping
+        table names to such lists or tuples, or a string with a single column name
+    linked_tables : dict
+        mapping a table name to a dict which, in turn, maps a column name to a linked
+        table name
+    with_id : boolean
+        whether the internal anvil id should be included in the serialised output
+
+    Returns
+    -------
+    tuple
+        of the list of column names and a function taking a row and an optional memo
+        dict and returning a list of values in the same order. Missing values are
+        None.
+    """
+    fields, links = _serialiser_fields(
+        table_name, columns, ignore_columns, linked_tables, with_id
+    )
+    names = [name for name, _ in fields] + [name for name, _ in links]
+    if with_id:
+        names.append("_id")
+
+    def serialise_values(row, memo=None):
+        values = []
+        for name, convert in fields:
+            try:
+                value = row[name]
+            except KeyError:
+                value = None
+            if convert is not None and value is not None:
+                value = convert(value)
+            values.append(value)
+        for name, serialise_link in links:
+            try:
+                value = row[name]
+            except KeyError:
+                value = None
+            values.append(serialise_link(value, memo))
+        if with_id:
+            values.append(row.get_id())
+        return values
+
+    return names, serialise_values
+
+
+class RowSerialiser:
+    """Serialises data table rows to dicts without marshmallow
+
+    It has the same dump method as the schema returned by datatable_schema.
+    Calling it with a single row is equivalent to calling dump with that row.
+    """
+
+    def __init__(self, serialise):
+        self._serialise = serialise
+
+    def __call__(self, row):
+        return self._serialise(row, {})
+
+    def dump(self, obj, many=False):
+        if many:
+            # rows linked from several rows are serialised once
+            memo = {}
+            return [self._serialise(row, memo) for row in obj]
+        return self._serialise(obj, {})
+
+
+class ColumnarSerialiser:
+    """Serialises data table rows to lists of values without marshmallow
+
+    The column names are only included once, so the output is much smaller than a
+    list of dicts.
+    """
+
+    def __init__(self, columns, serialise_values):
+        self.columns = columns
+        self._serialise_values = serialise_values
+
+    def __call__(self, row):
+        return self._serialise_values(row, {})
+
+    def dump(self, rows):
+        "returns a dict with the column names and a list of values for each row"
+        memo = {}
+        return {
+            "columns": list(self.columns),
+            "rows": [self._serialise_values(row, memo) for row in rows],
+        }
+
+
+# The following functions hit the data tables service.
+# They are tested against the in-memory app_tables in tests/fake_tables.py.
 def _columns(table_name, linked_tables):
     """Generate a dict mapping table names to column lists
 
@@ -201,7 +594,12 @@ def _columns(table_name, linked_tables):
     tables = {table_name}.union(
         {table for link in linked_tables.values() for table in link.values()}
     )
-    return {table: getattr(app_tables, table).list_columns() for table in tables}
+    return {
+        table: _cached(
+            ("columns", table), lambda: getattr(app_tables, table).list_columns()
+        )
+        for table in tables
+    }
 
 
 def datatable_schema(
@@ -209,6 +607,8 @@ def datatable_schema(
 ):
     """Generate a marshmallow Schema dynamically from a table name
 
+    Schemas are cached, so calls with the same arguments return the same instance.
+
     Parameters
     ----------
     table_name : str
@@ -226,11 +626,126 @@ def datatable_schema(
     -------
     marshmallow.Schema
     """
-    mm = lazy.marshmallow
     if linked_tables is None:
         linked_tables = {}
-    columns = _columns(table_name, linked_tables)
-    schema_definition = _schema_definition(
-        table_name, columns, ignore_columns, linked_tables, with_id
+
+    def build():
+        mm = lazy.marshmallow
+        columns = _columns(table_name, linked_tables)
+        schema_definition = _schema_definition(
+            table_name, columns, ignore_columns, linked_tables, with_id
+        )
+        return mm.Schema.from_dict(schema_definition)()
+
+    key = (
+        "schema",
+        table_name,
+        _freeze(ignore_columns),
+        _freeze(linked_tables),
+        with_id,
+    )
+    return _cached(key, build)
+
+
+def datatable_serialiser(
+    table_name, ignore_columns=None, linked_tables=None, with_id=False, columnar=False
+):
+    """Generate a RowSerialiser dynamically from a table name
+
+    This gives the same results as datatable_schema but is much faster for large
+    numbers of rows. Like schemas, serialisers are cached.
+
+    Parameters
+    ----------
+    table_name : str
+        The name of a data table within the app
+    ignore_columns :  list, tuple, dict or str
+        A list or tuple of column names to ignore, a dict mapping
+        table names to such lists or tuples, or a string with a single column name
+    linked_tables : dict
+        mapping a table name to a dict which, in turn, maps a column name to a linked
+        table name
+    with_id : boolean
+        whether the internal anvil id should be included in the serialised output
+    columnar : boolean
+        whether to return a ColumnarSerialiser, which dumps rows as lists of values
+
+    Returns
+    -------
+    RowSerialiser or ColumnarSerialiser
+    """
+    if linked_tables is None:
+        linked_tables = {}
+
+    def build():
+        columns = _columns(table_name, linked_tables)
+        args = (table_name, columns, ignore_columns, linked_tables, with_id)
+        if columnar:
+            return ColumnarSerialiser(*_values_serialiser(*args))
+        return RowSerialiser(_serialiser(*args))
+
+    key = (
+        "serialiser",
+        table_name,
+        _freeze(ignore_columns),
+        _freeze(linked_tables),
+        with_id,
+        columnar,
     )
-    return mm.Schema.from_dict(schema_definition)()
+    return _cached(key, build)
+
+
+def iter_serialise(
+    table_name,
+    rows,
+    ignore_columns=None,
+    linked_tables=None,
+    with_id=False,
+    chunk_size=500,
+    workers=None,
+):
+    """Lazily serialise rows in chunks
+
+    Only a few chunks of rows are held in memory at a time, so this is suitable for
+    streaming a large search result to a file.
+
+    Parameters
+    ----------
+    table_name : str
+        The name of a data table within the app
+    rows : iterable
+        of rows from the table, e.g. the result of a search
+    ignore_columns :  list, tuple, dict or str
+        A list or tuple of column names to ignore, a dict mapping
+        table names to such lists or tuples, or a string with a single column name
+    linked_tables : dict
+        mapping a table name to a dict which, in turn, maps a column name to a linked
+        table name
+    with_id : boolean
+        whether the internal anvil id should be included in the serialised output
+    chunk_size : int
+        the maximum number of rows in each chunk
+    workers : int
+        if set, the number of threads used to serialise chunks concurrently.
+        Chunks are still yielded in order. A chunk that fails raises a ChunkError.
+
+    Returns
+    -------
+    generator
+        of lists of dicts
+    """
+    serialise = datatable_serialiser(
+        table_name, ignore_columns, linked_tables, with_id
+    )._serialise
+
+    def serialise_chunk(chunk):
+        # linked rows are serialised once per chunk
+        memo = {}
+        return [serialise(row, memo) for row in chunk]
+
+    chunks = _chunks(rows, chunk_size)
+    if workers is None:
+        for chunk in chunks:
+            yield serialise_chunk(chunk)
+    else:
+        yield from _map_threaded(serialise_chunk, chunks, workers)
@@ -0,0 +1,167 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2021 anvilistas
+"""Serialisation benchmarks against an in-memory app_tables
+
+    python tests/benchmarks/bench_serialisation.py [-k name] [--save | --compare]
+
+Tables are generated from a fixed seed so that runs are comparable.
+Benchmark names give the number of rows and the depth of linked tables.
+"""
+import random
+import string
+import sys
+from datetime import date
+
+from runner import Suite, add_repo_to_path
+
+add_repo_to_path()
+
+from server_code import serialisation  # noqa: E402
+from tests.fake_tables import FakeAppTables  # noqa: E402
+
+SEED = 42
+ROW_COUNTS = (100, 1000)
+DEPTHS = (0, 1, 2)
+
+suite = Suite("serialisation")
+
+
+def random_word(rng, min_len=3, max_len=10):
+    return "".join(
+        rng.choice(string.ascii_lowercase) for _ in range(rng.randint(min_len, max_len))
+    )
+
+
+def make_app_tables(rows, seed=SEED):
+    """books link to authors, which link to publishers
+
+    There are ten books for each author and ten authors for each publisher.
+    """
+    rng = random.Random(seed)
+    app_tables = FakeAppTables()
+    publishers = app_tables.add_table("publishers", name="string", country="string")
+    authors = app_tables.add_table(
+        "authors", name="string", born="date", publisher="link_single"
+    )
+    books = app_tables.add_table(
+        "books",
+        title="string",
+        published="date",
+        in_print="bool",
+        tags="simpleObject",
+        author="link_single",
+    )
+
+    publisher_rows = [
+        publishers.add_row(name=random_word(rng).title(), country=rng.choice("GFDU"))
+        for _ in range(max(1, rows // 100))
+    ]
+    author_rows = [
+        authors.add_row(
+            name=f"{random_word(rng).title()} {random_word(rng).title()}",
+            born=date(rng.randint(1900, 2000), rng.randint(1, 12), rng.randint(1, 28)),
+            publisher=rng.choice(publisher_rows),
+        )
+        for _ in range(max(1, rows // 10))
+    ]
+    for _ in range(rows):
+        books.add_row(
+            title=" ".join(random_word(rng) for _ in range(rng.randint(1, 5))),
+            published=date(rng.randint(1950, 2020), rng.randint(1, 12), 1),
+            in_print=rng.random() < 0.5,
+            tags=[random_word(rng) for _ in range(rng.randint(0, 3))],
+            author=rng.choice(author_rows),
+        )
+    return app_tables
+
+
+def linked_tables(depth):
+    links = {"books": {"author": "authors"}, "authors": {"publisher": "publishers"}}
+    return dict(list(links.items())[:depth])
+
+
+def use_tables(rows):
+    app_tables = make_app_tables(rows)
+    serialisation.app_tables = app_tables
+    serialisation.invalidate()
+    return app_tables
+
+
+@suite.bench
+def schema_construction_uncached():
+    use_tables(10)
+
+    def build():
+        serialisation.invalidate()
+        serialisation.datatable_schema("books", linked_tables=linked_tables(2))
+
+    return build
+
+
+@suite.bench
+def schema_construction_cached():
+    use_tables(10)
+    return lambda: serialisation.datatable_schema(
+        "books", linked_tables=linked_tables(2)
+    )
+
+
+@suite.bench
+def serialiser_construction_uncached():
+    use_tables(10)
+
+    def build():
+        serialisation.invalidate()
+        serialisation.datatable_serialiser("books", linked_tables=linked_tables(2))
+
+    return build
+
+
+def register_dumps(rows, depth):
+    def schema_dump():
+        app_tables = use_tables(rows)
+        schema = serialisation.datatable_schema(
+            "books", linked_tables=linked_tables(depth), with_id=True
+        )
+        search = app_tables.books.search()
+        return lambda: schema.dump(search, many=True)
+
+    def serialiser_dump():
+        app_tables = use_tables(rows)
+        serialiser = serialisation.datatable_serialiser(
+            "books", linked_tables=linked_tables(depth), with_id=True
+        )
+        search = app_tables.books.search()
+        return lambda: serialiser.dump(search, many=True)
+
+    def columnar_dump():
+        app_tables = use_tables(rows)
+        serialiser = serialisation.datatable_serialiser(
+            "books", linked_tables=linked_tables(depth), with_id=True, columnar=True
+        )
+        search = app_tables.books.search()
+        return lambda: serialiser.dump(search)
+
+    def iter_serialise():
+        app_tables = use_tables(rows)
+        search = app_tables.books.search()
+        return lambda: [
+            row
+            for chunk in serialisation.iter_serialise(
+                "books", search, linked_tables=linked_tables(depth), with_id=True
+            )
+            for row in chunk
+        ]
+
+    for setup in (schema_dump, serialiser_dump, columnar_dump, iter_serialise):
+        setup.__name__ = f"{setup.__name__}_{rows}_depth{depth}"
+        suite.bench(setup)
+
+
+for rows in ROW_COUNTS:
+    for depth in DEPTHS:
+        register_dumps(rows, depth)
+
+
+if __name__ == "__main__":
+    sys.exit(suite.main())
@@ -0,0 +1,306 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2021 anvilistas
+"""Zod benchmarks
+
+    python tests/benchmarks/bench_zod.py [-k name] [--save | --compare]
+
+Payloads are generated from a fixed seed so that runs are comparable.
+"""
+import random
+import re
+import string
+import sys
+from datetime import date
+
+from runner import Suite, add_repo_to_path
+
+add_repo_to_path()
+
+import client_code.zod as z  # noqa: E402
+
+SEED = 42
+
+suite = Suite("zod")
+
+
+# payload generators
+def random_word(rng, min_len=3, max_len=10):
+    return "".join(
+        rng.choice(string.ascii_lowercase) for _ in range(rng.randint(min_len, max_len))
+    )
+
+
+def random_email(rng, invalid_rate=0.0):
+    if rng.random() < invalid_rate:
+        return random_word(rng)
+    return f"{random_word(rng)}.{random_word(rng)}@{random_word(rng)}.com"
+
+
+def random_code(rng):
+    letters = "".join(rng.choice(string.ascii_uppercase) for _ in range(3))
+    return f"{letters}-{rng.randint(0, 9999):04d}"
+
+
+def random_address(rng):
+    return {
+        "street": f"{rng.randint(1, 999)} {random_word(rng).title()} Street",
+        "city": random_word(rng).title(),
+        "postcode": random_code(rng),
+        "country": rng.choice(["GB", "FR", "DE", "US"]),
+    }
+
+
+def random_person(rng):
+    return {
+        "id": rng.randint(1, 10**6),
+        "name": f"{random_word(rng).title()} {random_word(rng).title()}",
+        "email": random_email(rng),
+        "born": date(rng.randint(1950, 2005), rng.randint(1, 12), rng.randint(1, 28)),
+        "score": rng.random() * 100,
+        "tags": [random_word(rng) for _ in range(rng.randint(0, 5))],
+        "address": random_address(rng),
+        "company": {
+            "name": random_word(rng).title(),
+            "address": random_address(rng),
+            "employees": rng.randint(1, 5000),
+        },
+    }
+
+
+def random_event(rng):
+    kind = rng.choice(["invoice", "refund", "payment", "note", "transfer"])
+    event = {"type": kind, "id": rng.randint(1, 10**6)}
+    if kind in ("invoice", "refund", "payment", "transfer"):
+        event["amount"] = rng.randint(1, 10**5)
+    if kind == "refund":
+        event["reason"] = random_word(rng)
+    if kind == "note":
+        event["text"] = random_word(rng, 10, 40)
+    if kind == "transfer":
+        event["to"] = random_word(rng)
+    return event
+
+
+def random_tree(rng, size):
+    root = {"name": random_word(rng), "subcategories": []}
+    nodes = [root]
+    for _ in range(size - 1):
+        node = {"name": random_word(rng), "subcategories": []}
+        rng.choice(nodes)["subcategories"].append(node)
+        nodes.append(node)
+    return root
+
+
+# schemas
+address_schema = z.typed_dict(
+    {
+        "street": z.string().min(1),
+        "city": z.string().min(1),
+        "postcode": z.string().regex(re.compile(r"^[A-Z]{3}-\d{4}$")),
+        "country": z.enum(["GB", "FR", "DE", "US"]),
+    }
+)
+
+person_schema = z.typed_dict(
+    {
+        "id": z.integer().positive(),
+        "name": z.string().strip().min(1).max(100),
+        "email": z.string().email(),
+        "born": z.date(),
+        "score": z.float().ge(0).le(100),
+        "tags": z.list(z.string()),
+        "address": address_schema,
+        "company": z.typed_dict(
+            {
+                "name": z.string(),
+                "address": address_schema,
+                "employees": z.integer().ge(1),
+            }
+        ),
+        "nickname": z.string().not_required(),
+    }
+)
+
+event_options = [
+    z.typed_dict(
+        {"type": z.literal("invoice"), "id": z.integer(), "amount": z.integer()}
+    ),
+    z.typed_dict(
+        {
+            "type": z.literal("refund"),
+            "id": z.integer(),
+            "amount": z.integer(),
+            "reason": z.string(),
+        }
+    ),
+    z.typed_dict(
+        {"type": z.literal("payment"), "id": z.integer(), "amount": z.integer()}
+    ),
+    z.typed_dict({"type": z.literal("note"), "id": z.integer(), "text": z.string()}),
+    z.typed_dict(
+        {
+            "type": z.literal("transfer"),
+            "id": z.integer(),
+            "amount": z.integer(),
+            "to": z.string(),
+        }
+    ),
+]
+
+Category = z.lazy(
+    lambda: z.typed_dict({"name": z.string(), "subcategories": z.list(Category)})
+)
+
+
+# benchmarks
+@suite.bench
+def string_email_chain():
+    rng = random.Random(SEED)
+    schema = z.string().strip().lower().min(5).max(100).email()
+    emails = [random_email(rng, invalid_rate=0.1) for _ in range(1000)]
+    return lambda: [schema.safe_parse(e) for e in emails]
+
+
+@suite.bench
+def string_email_chain_compiled():
+    rng = random.Random(SEED)
+    schema = z.string().strip().lower().min(5).max(100).email().compile()
+    emails = [random_email(rng, invalid_rate=0.1) for _ in range(1000)]
+    return lambda: [schema.safe_parse(e) for e in emails]
+
+
+@suite.bench
+def string_regex():
+    rng = random.Random(SEED)
+    schema = z.list(z.string().regex(re.compile(r"^[A-Z]{3}-\d{4}$")))
+    codes = [random_code(rng) for _ in range(5000)]
+    return lambda: schema.parse(codes)
+
+
+@suite.bench
+def typed_dict_nested():
+    rng = random.Random(SEED)
+    people = [random_person(rng) for _ in range(200)]
+    return lambda: [person_schema.parse(p) for p in people]
+
+
+@suite.bench
+def typed_dict_nested_compiled():
+    rng = random.Random(SEED)
+    schema = person_schema.compile()
+    people = [random_person(rng) for _ in range(200)]
+    return lambda: [schema.parse(p) for p in people]
+
+
+@suite.bench
+def typed_dict_nested_invalid():
+    rng = random.Random(SEED)
+    people = [random_person(rng) for _ in range(200)]
+    for person in people[::4]:
+        person["address"]["postcode"] = "invalid"
+    return lambda: [person_schema.safe_parse(p).error for p in people]
+
+
+@suite.bench
+def typed_dict_wide():
+    rng = random.Random(SEED)
+    shape = {f"field_{i}": z.string() if i % 2 else z.integer() for i in range(40)}
+    schema = z.typed_dict(shape)
+    rows = [
+        {k: random_word(rng) if i % 2 else i for i, k in enumerate(shape)}
+        for _ in range(500)
+    ]
+    return lambda: [schema.parse(r) for r in rows]
+
+
+@suite.bench
+def list_large_integers():
+    rng = random.Random(SEED)
+    schema = z.list(z.integer().ge(0))
+    data = [rng.randint(0, 10**6) for _ in range(50000)]
+    return lambda: schema.parse(data)
+
+
+@suite.bench
+def list_large_rows():
+    rng = random.Random(SEED)
+    schema = z.list(address_schema)
+    data = [random_address(rng) for _ in range(5000)]
+    return lambda: schema.parse(data)
+
+
+@suite.bench
+def list_parse_many_rows():
+    rng = random.Random(SEED)
+    data = [random_address(rng) for _ in range(5000)]
+    return lambda: list(address_schema.safe_parse_many(data))
+
+
+@suite.bench
+def list_large_invalid_abort_early():
+    rng = random.Random(SEED)
+    schema = z.list(z.integer())
+    data = [rng.randint(0, 10**6) for _ in range(50000)]
+    data[10] = "invalid"
+    return lambda: schema.safe_parse(data, abort_early=True)
+
+
+@suite.bench
+def union_five_options():
+    rng = random.Random(SEED)
+    schema = z.list(z.union(event_options))
+    events = [random_event(rng) for _ in range(1000)]
+    return lambda: schema.parse(events)
+
+
+@suite.bench
+def discriminated_union_five_options():
+    rng = random.Random(SEED)
+    schema = z.list(z.discriminated_union("type", event_options))
+    events = [random_event(rng) for _ in range(1000)]
+    return lambda: schema.parse(events)
+
+
+@suite.bench
+def lazy_recursive_tree():
+    rng = random.Random(SEED)
+    tree = random_tree(rng, 2000)
+    return lambda: Category.parse(tree)
+
+
+@suite.bench
+def coercion():
+    rng = random.Random(SEED)
+    schema = z.typed_dict(
+        {
+            "id": z.coerce.integer(),
+            "name": z.coerce.string(),
+            "score": z.coerce.float(),
+            "active": z.coerce.boolean(),
+        }
+    )
+    rows = [
+        {
+            "id": str(rng.randint(1, 10**6)),
+            "name": rng.randint(1, 10**6),
+            "score": str(rng.random()),
+            "active": rng.randint(0, 1),
+        }
+        for _ in range(2000)
+    ]
+    return lambda: [schema.parse(r) for r in rows]
+
+
+@suite.bench
+def error_messages():
+    rng = random.Random(SEED)
+    schema = z.list(person_schema)
+    people = [random_person(rng) for _ in range(200)]
+    for person in people[::2]:
+        person["email"] = "invalid"
+        person["score"] = -1
+    return lambda: schema.safe_parse(people).error.message
+
+
+if __name__ == "__main__":
+    sys.exit(suite.main())
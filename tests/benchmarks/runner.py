@@ -0,0 +1,129 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2021 anvilistas
+"""A minimal benchmark runner with stored baselines
+
+Each benchmark is a setup function registered on a Suite. The setup function
+builds its schema and payload and returns a callable that is timed, so data
+generation is never included in the measurement.
+
+Baselines are stored as json in tests/benchmarks/baselines/<suite>.json.
+They are machine dependent, so they are ignored by git rather than committed.
+Save a baseline before making a change and compare against it afterwards on the
+same machine:
+
+    python tests/benchmarks/bench_zod.py --save
+    # make changes
+    python tests/benchmarks/bench_zod.py --compare
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+
+
+class Suite:
+    def __init__(self, name):
+        self.name = name
+        self.benchmarks = {}
+
+    def bench(self, setup):
+        "decorator to register a setup function returning the callable to time"
+        self.benchmarks[setup.__name__] = setup
+        return setup
+
+    @property
+    def baseline_path(self):
+        return BASELINE_DIR / f"{self.name}.json"
+
+    def load_baseline(self):
+        if not self.baseline_path.exists():
+            return {}
+        return json.loads(self.baseline_path.read_text())
+
+    def save_baseline(self, timings):
+        BASELINE_DIR.mkdir(exist_ok=True)
+        baseline = {**self.load_baseline(), **timings}
+        self.baseline_path.write_text(
+            json.dumps(baseline, indent=2, sort_keys=True) + "\n"
+        )
+
+    def main(self, argv=None):
+        parser = argparse.ArgumentParser(description=f"Run the {self.name} benchmarks")
+        parser.add_argument("-k", dest="keyword", help="only run benchmarks matching")
+        parser.add_argument("--rounds", type=int, default=5)
+        parser.add_argument("--min-time", type=float, default=0.1, help="per round")
+        parser.add_argument("--save", action="store_true", help="save as baseline")
+        parser.add_argument("--compare", action="store_true", help="fail on regression")
+        parser.add_argument("--tolerance", type=float, default=0.2)
+        args = parser.parse_args(argv)
+
+        baseline = self.load_baseline()
+        timings = {}
+        regressions = []
+
+        print(
+            f"{'benchmark':<36}{'best':>12}{'median':>12}{'baseline':>12}{'ratio':>8}"
+        )
+        for name, setup in self.benchmarks.items():
+            if args.keyword and args.keyword not in name:
+                continue
+            best, median = measure(setup(), args.rounds, args.min_time)
+            timings[name] = best
+            base = baseline.get(name)
+            ratio = best / base if base else None
+            print(
+                f"{name:<36}{format_time(best):>12}{format_time(median):>12}"
+                f"{format_time(base):>12}{'' if ratio is None else f'{ratio:.2f}':>8}"
+            )
+            if ratio is not None and ratio > 1 + args.tolerance:
+                regressions.append(name)
+
+        if args.save:
+            self.save_baseline(timings)
+            print(f"saved baseline to {self.baseline_path}")
+
+        if args.compare and regressions:
+            print(f"regressions: {', '.join(regressions)}")
+            return 1
+        return 0
+
+
+def measure(fn, rounds, min_time):
+    "returns the best and median seconds per call"
+    number = 1
+    while True:
+        elapsed = _time(fn, number)
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+
+    per_call = [elapsed / number]
+    for _ in range(rounds - 1):
+        per_call.append(_time(fn, number) / number)
+    return min(per_call), statistics.median(per_call)
+
+
+def _time(fn, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return time.perf_counter() - start
+
+
+def format_time(seconds):
+    if seconds is None:
+        return "-"
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+
+def add_repo_to_path():
+    root = str(Path(__file__).resolve().parents[2])
+    if root not in sys.path:
+        sys.path.insert(0, root)
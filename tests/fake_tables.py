@@ -0,0 +1,156 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2021 anvilistas
+"""An in-memory stand-in for anvil.tables.app_tables
+
+Only the parts used by the server modules are implemented: list_columns, search,
+get, get_by_id and add_row, plus rows with item access and get_id. Searches only
+filter on keyword arguments, with values or q.any_of.
+
+As with real data tables, a search returns rows with their data loaded, whereas
+a linked row is a reference which is fetched when one of its columns is first
+read. Each table counts its fetches, and can be given a latency to simulate the
+round trip to the data tables service.
+
+    app_tables = FakeAppTables()
+    authors = app_tables.add_table("authors", name="string")
+    books = app_tables.add_table("books", title="string", author="link_single")
+    books.add_row(title="Fluent Python", author=authors.add_row(name="Luciano"))
+    monkeypatch.setattr(serialisation, "app_tables", app_tables)
+"""
+import time
+
+from anvil.tables import query as q
+
+
+def _matches(value, expected):
+    if isinstance(expected, q.any_of):
+        return any(value == arg for arg in expected.args)
+    return value == expected
+
+
+class FakeRow:
+    def __init__(self, table, row_id, loaded=True):
+        self._table = table
+        self._id = row_id
+        self._loaded = loaded
+
+    def _fetch(self):
+        if not self._loaded:
+            self._table.fetches += 1
+            if self._table.latency:
+                time.sleep(self._table.latency)
+            self._loaded = True
+        return self._table._records[self._id]
+
+    def __getitem__(self, key):
+        record = self._fetch()
+        if key not in record:
+            raise KeyError(key)
+        value = record[key]
+        if value is None:
+            return None
+        # every read of a link gives a new reference, which is fetched on first use
+        column_type = self._table.columns[key]
+        if column_type == "link_single":
+            return value._reference()
+        elif column_type == "link_multiple":
+            return [row._reference() for row in value]
+        return value
+
+    def __setitem__(self, key, value):
+        self._table._check_column(key)
+        self._fetch()[key] = value
+
+    def __iter__(self):
+        return iter((key, self[key]) for key in self._fetch())
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, FakeRow)
+            and self._table is other._table
+            and self._id == other._id
+        )
+
+    def __hash__(self):
+        return hash((self._table.name, self._id))
+
+    def __repr__(self):
+        return f"<FakeRow {self._table.name} {self._id}>"
+
+    def _reference(self):
+        return FakeRow(self._table, self._id, loaded=False)
+
+    def get_id(self):
+        return f"[{self._table.table_id},{self._id}]"
+
+
+class FakeTable:
+    def __init__(self, name, table_id, columns, latency=0):
+        self.name = name
+        self.table_id = table_id
+        self.columns = columns
+        self.latency = latency
+        self.fetches = 0
+        self._records = {}
+
+    def _check_column(self, key):
+        if key not in self.columns:
+            raise KeyError(f"no column {key!r} in table {self.name!r}")
+
+    def list_columns(self):
+        return [
+            {"name": name, "type": column_type}
+            for name, column_type in self.columns.items()
+        ]
+
+    def add_row(self, **values):
+        for key in values:
+            self._check_column(key)
+        row_id = len(self._records) + 1
+        self._records[row_id] = {name: values.get(name) for name in self.columns}
+        return FakeRow(self, row_id)
+
+    def search(self, *queries, **filters):
+        # query objects, e.g. q.fetch_only, are accepted but ignored
+        return [
+            FakeRow(self, row_id)
+            for row_id, record in self._records.items()
+            if all(_matches(record[key], value) for key, value in filters.items())
+        ]
+
+    def get(self, **filters):
+        rows = self.search(**filters)
+        if len(rows) > 1:
+            raise ValueError("More than one row matched this query")
+        return rows[0] if rows else None
+
+    def get_by_id(self, row_id):
+        table_id, _, row_id = row_id.strip("[]").partition(",")
+        row_id = int(row_id)
+        if int(table_id) != self.table_id or row_id not in self._records:
+            return None
+        return FakeRow(self, row_id)
+
+    def __len__(self):
+        return len(self._records)
+
+
+class FakeAppTables:
+    def __init__(self):
+        self._tables = {}
+
+    def add_table(self, table_name, /, latency=0, **columns):
+        "columns map each column name to its type, e.g. title='string'"
+        table = FakeTable(table_name, len(self._tables) + 1, columns, latency)
+        self._tables[table_name] = table
+        return table
+
+    def __getattr__(self, name):
+        try:
+            return self._tables[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    @property
+    def fetches(self):
+        return sum(table.fetches for table in self._tables.values())
@@ -0,0 +1,274 @@
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2021 anvilistas
+import anvil.users
+
+import pytest
+
+from server_code import authorisation
+from tests.fake_tables import FakeAppTables
+
+
+@pytest.fixture
+def app_tables(monkeypatch):
+    app_tables = FakeAppTables()
+    permissions = app_tables.add_table("permissions", name="string")
+    roles = app_tables.add_table("roles", name="string", permissions="link_multiple")
+    users = app_tables.add_table("users", email="string", roles="link_multiple")
+
+    view = permissions.add_row(name="can_view")
+    edit = permissions.add_row(name="can_edit")
+    viewer = roles.add_row(name="viewer", permissions=[view])
+    editor = roles.add_row(name="editor", permissions=[view, edit])
+    users.add_row(email="viewer@example.com", roles=[viewer])
+    users.add_row(email="editor@example.com", roles=[editor])
+    users.add_row(email="nobody@example.com", roles=None)
+
+    monkeypatch.setattr(authorisation, "app_tables", app_tables)
+    authorisation.invalidate()
+    yield app_tables
+    authorisation.set_config(
+        get_roles=None,
+        cache_ttl=None,
+        cache_size=10000,
+        roles_table="roles",
+        index_roles=False,
+        metrics=False,
+    )
+    authorisation.reset_metrics()
+
+
+def login(monkeypatch, user):
+    monkeypatch.setattr(anvil.users, "get_user", lambda: user)
+
+
+def test_has_permission(app_tables):
+    users = app_tables.users
+    viewer = users.get(email="viewer@example.com")
+    editor = users.get(email="editor@example.com")
+    nobody = users.get(email="nobody@example.com")
+
+    assert authorisation.has_permission("can_view", user=viewer)
+    assert not authorisation.has_permission("can_edit", user=viewer)
+    assert authorisation.has_permission(["can_view", "can_edit"], user=editor)
+    assert not authorisation.has_permission("can_view", user=nobody)
+    assert not authorisation.has_permission("can_view", user=None)
+
+
+def test_call_scope_cache(app_tables, monkeypatch):
+    editor = app_tables.users.get(email="editor@example.com")
+    login(monkeypatch, editor)
+
+    @authorisation.authorisation_required("can_view")
+    @authorisation.authorisation_required(["can_view", "can_edit"])
+    def edit():
+        assert authorisation.has_permission("can_edit")
+        return app_tables.roles.fetches
+
+    app_tables.roles.fetches = 0
+    # the editor role is only fetched once for all three checks
+    assert edit() == 1
+    assert edit() == 2
+
+    @authorisation.authorisation_required("can_edit")
+    def demote():
+        editor["roles"] = [app_tables.roles.get(name="viewer")]
+        authorisation.invalidate(editor)
+        return authorisation.has_permission("can_edit")
+
+    assert demote() is False
+    with pytest.raises(ValueError, match="Authorisation required"):
+        edit()
+
+
+def test_ttl_cache(app_tables, monkeypatch):
+    now = [0]
+    monkeypatch.setattr(authorisation, "monotonic", lambda: now[0])
+    authorisation.set_config(cache_ttl=10)
+    editor = app_tables.users.get(email="editor@example.com")
+
+    app_tables.roles.fetches = 0
+    for _ in range(3):
+        assert authorisation.has_permission("can_edit", user=editor)
+    assert app_tables.roles.fetches == 1
+
+    now[0] = 10
+    assert authorisation.has_permission("can_edit", user=editor)
+    assert app_tables.roles.fetches == 2
+
+    editor["roles"] = []
+    assert authorisation.has_permission("can_edit", user=editor)
+    authorisation.invalidate(editor)
+    assert not authorisation.has_permission("can_edit", user=editor)
+
+
+def test_ttl_cache_size(app_tables, monkeypatch):
+    now = [0]
+    monkeypatch.setattr(authorisation, "monotonic", lambda: now[0])
+    authorisation.set_config(cache_ttl=10, cache_size=2)
+    viewer, editor, nobody = app_tables.users.search()
+
+    authorisation.has_permission("can_view", user=viewer)
+    now[0] = 5
+    authorisation.has_permission("can_view", user=editor)
+    authorisation.has_permission("can_view", user=nobody)
+    # the oldest entry makes way for the newest
+    assert list(authorisation._cache) == [editor.get_id(), nobody.get_id()]
+
+    now[0] = 15
+    authorisation.has_permission("can_view", user=editor)
+    # the expired entry is removed on write, even though the cache isn't full
+    assert list(authorisation._cache) == [editor.get_id()]
+
+    # users without get_id aren't cached, so there's nothing to invalidate
+    authorisation.invalidate({"roles": []})
+    assert len(authorisation._cache) == 1
+
+
+def test_role_index(app_tables):
+    authorisation.set_config(index_roles=True)
+    editor = app_tables.users.get(email="editor@example.com")
+    viewer = app_tables.users.get(email="viewer@example.com")
+
+    assert authorisation.has_permission("can_edit", user=editor)
+    fetches = app_tables.fetches
+    for _ in range(3):
+        assert authorisation.has_permission(["can_view", "can_edit"], user=editor)
+        assert not authorisation.has_permission("can_edit", user=viewer)
+    assert app_tables.fetches == fetches
+
+    # roles added after the index was built are read from the table
+    auditor = app_tables.roles.add_row(
+        name="auditor", permissions=[app_tables.permissions.add_row(name="can_audit")]
+    )
+    viewer["roles"] = [auditor]
+    authorisation.invalidate(viewer)
+    assert authorisation.has_permission("can_audit", user=viewer)
+
+    app_tables.roles.get(name="editor")["permissions"] = []
+    assert authorisation.has_permission("can_edit", user=editor)
+    index = authorisation.refresh_role_index()
+    assert index[auditor.get_id()] == {"can_audit"}
+    assert not authorisation.has_permission("can_edit", user=editor)
+
+
+def test_role_index_keeps_call_cache(app_tables, monkeypatch):
+    usermap = app_tables.add_table("usermap", user="link_single", roles="link_multiple")
+    viewer, editor, nobody = app_tables.users.search()
+    usermap.add_row(user=editor, roles=[app_tables.roles.get(name="editor")])
+    authorisation.set_config(get_roles="usermap", index_roles=True, metrics=True)
+
+    @authorisation.authentication_required
+    def view():
+        # nobody has no roles, so the index is first loaded for the editor
+        authorisation.has_permission("can_view", user=nobody)
+        authorisation.has_permission("can_view", user=editor)
+        authorisation.has_permission("can_view", user=nobody)
+        # an unchanged index leaves the cached permissions alone
+        authorisation.refresh_role_index()
+        authorisation.has_permission("can_view", user=editor)
+
+    login(monkeypatch, editor)
+    view()
+    metrics = authorisation.get_metrics()
+    assert (metrics["cache_hits"], metrics["cache_misses"]) == (2, 2)
+
+
+def test_role_index_table(app_tables):
+    groups = app_tables.add_table("groups", name="string", permissions="link_multiple")
+    admin = groups.add_row(
+        name="admin", permissions=[app_tables.permissions.get(name="can_edit")]
+    )
+    members = app_tables.add_table("members", roles="link_multiple")
+    member = members.add_row(roles=[admin])
+    authorisation.set_config(roles_table="groups", index_roles=True)
+
+    assert authorisation.refresh_role_index() == {admin.get_id(): {"can_edit"}}
+    fetches = app_tables.fetches
+    assert authorisation.has_permission("can_edit", user=member)
+    assert app_tables.fetches == fetches
+
+
+@pytest.mark.parametrize("index_roles", [False, True])
+def test_bulk_permissions(app_tables, index_roles):
+    authorisation.set_config(index_roles=index_roles)
+    users = app_tables.users.search()
+    viewer, editor, nobody = users
+
+    app_tables.roles.fetches = 0
+    assert authorisation.permissions_for(users + [None]) == [
+        {"can_view"},
+        {"can_view", "can_edit"},
+        frozenset(),
+        frozenset(),
+    ]
+    # each role is read once, or not at all with the index
+    assert app_tables.roles.fetches == (0 if index_roles else 2)
+    assert authorisation.filter_authorised(users, "can_edit") == [editor]
+    assert authorisation.filter_authorised(users, ["can_view"]) == [viewer, editor]
+
+
+def test_bulk_permissions_without_get_id(app_tables):
+    # any object the roles getter can read is accepted, as with has_permission
+    guest = {"roles": [app_tables.roles.get(name="viewer")]}
+    editor = app_tables.users.get(email="editor@example.com")
+    assert authorisation.permissions_for([guest, editor, {"roles": None}]) == [
+        {"can_view"},
+        {"can_view", "can_edit"},
+        frozenset(),
+    ]
+    assert authorisation.filter_authorised([guest, editor], "can_view") == [
+        guest,
+        editor,
+    ]
+
+
+def test_bulk_permissions_from_table(app_tables):
+    usermap = app_tables.add_table("usermap", user="link_single", roles="link_multiple")
+    viewer, editor, nobody = app_tables.users.search()
+    usermap.add_row(user=viewer, roles=[app_tables.roles.get(name="viewer")])
+    usermap.add_row(user=editor, roles=[app_tables.roles.get(name="editor")])
+    authorisation.set_config(get_roles="usermap")
+
+    assert authorisation.permissions_for([nobody, editor]) == [
+        frozenset(),
+        {"can_view", "can_edit"},
+    ]
+    assert authorisation.has_permission("can_view", user=viewer)
+    assert authorisation.filter_authorised([viewer, editor, nobody], "can_view") == [
+        viewer,
+        editor,
+    ]
+
+
+def test_metrics(app_tables, monkeypatch):
+    @authorisation.authentication_required
+    def view():
+        return authorisation.has_permission("can_view")
+
+    @authorisation.authorisation_required("can_edit")
+    def edit():
+        pass
+
+    viewer = app_tables.users.get(email="viewer@example.com")
+    login(monkeypatch, viewer)
+    view()
+    assert authorisation.get_metrics()["functions"] == {}
+
+    authorisation.set_config(metrics=True)
+    assert view()
+    with pytest.raises(ValueError):
+        edit()
+    login(monkeypatch, None)
+    with pytest.raises(ValueError):
+        view()
+
+    metrics = authorisation.get_metrics()
+    view_stats = metrics["functions"][f"{__name__}.test_metrics.<locals>.view"]
+    edit_stats = metrics["functions"][f"{__name__}.test_metrics.<locals>.edit"]
+    assert (view_stats["calls"], view_stats["denied"]) == (2, 1)
+    assert (edit_stats["calls"], edit_stats["denied"]) == (1, 1)
+    assert view_stats["time"] > 0
+    assert (metrics["cache_hits"], metrics["cache_misses"]) == (0, 2)
+
+    authorisation.reset_metrics()
+    assert authorisation.get_metrics()["cache_misses"] == 0
@@ -1,5 +1,7 @@
 # SPDX-License-Identifier: MIT
 # Copyright (c) 2021 anvilistas
+import anvil.tables
+
 import pytest
 
 from client_code import persistence as ps
@@ -179,3 +181,122 @@ def test_linked_class_change_none(linked_persisted_book):
 def test_non_attributes_in_local_store(persisted_book):
     assert persisted_book.foo is None
     assert persisted_book["foo"] is None
+
+
+class BookRow(dict):
+    "Like a data tables row, it can't be read once deleted"
+
+    deleted = False
+
+    def __getitem__(self, key):
+        if self.deleted:
+            raise anvil.tables.RowDeleted("This row has been deleted")
+        return super().__getitem__(key)
+
+
+@pytest.fixture
+def book_server(monkeypatch):
+    """Fake book server functions over a dict of rows, recording each call"""
+    rows = {
+        title: BookRow(title=title)
+        for title in ("Fluent Python", "Dune", "Emma", "Ubik", "Solaris")
+    }
+    calls = []
+
+    def call(name, *args, **kwargs):
+        calls.append(name)
+        if name == "search_book":
+            return [rows[title] for title in kwargs["titles"]]
+        elif name == "get_book":
+            return rows.get(kwargs["title"])
+        elif name == "add_book":
+            row = BookRow(args[0])
+            rows[row["title"]] = row
+            return row
+        elif name == "update_book":
+            row, delta = args
+            del rows[row["title"]]
+            row.update(delta)
+            rows[row["title"]] = row
+        elif name == "delete_book":
+            row = rows.pop(args[0]["title"])
+            row.deleted = True
+
+    monkeypatch.setattr(ps.anvil.server, "call", call)
+    return calls
+
+
+def make_book_class(**attrs):
+    return ps.persisted_class(type("Book", (), {"key": "title", **attrs}))
+
+
+def test_cache_lru_eviction(book_server):
+    Book = make_book_class(cache_size=2)
+    dune = Book.get("Dune")
+    Book.get("Emma")
+    assert Book.get("Dune") is dune
+    Book.get("Ubik")
+    # Emma was the least recently used
+    assert Book.get("Dune") is dune
+    Book.get("Emma")
+    assert book_server.count("get_book") == 4
+    assert Book.cache_stats() == {"size": 2, "hits": 2, "misses": 4, "evictions": 2}
+
+    Book.clear_cache()
+    assert Book.cache_stats()["size"] == 0
+
+
+def test_cache_ttl(book_server, monkeypatch):
+    now = [0]
+    monkeypatch.setattr(ps, "_time", lambda: now[0])
+    Book = make_book_class(cache_ttl=10)
+    dune = Book.get("Dune")
+    now[0] = 9
+    assert Book.get("Dune") is dune
+    now[0] = 10
+    assert Book.get("Dune") is not dune
+    assert book_server.count("get_book") == 2
+
+
+def test_search_merges_cache(book_server):
+    Book = make_book_class()
+    dune = Book.get("Dune")
+    dune.title = "Dune Messiah"
+    emma = Book.get("Emma")
+
+    books = Book.search(titles=["Dune", "Ubik"])
+    # the cached object is reused, with its unsaved changes, and emma is kept
+    assert books[0] is dune
+    assert dune.title == "Dune Messiah"
+    assert Book.get("Emma") is emma
+    assert Book.get("Ubik") is books[1]
+    assert book_server.count("get_book") == 2
+
+    lazy = list(Book.search(lazy=True, titles=["Solaris"]))
+    assert lazy[0] is not Book.get("Solaris")
+
+
+def test_cache_follows_crud(book_server):
+    Book = make_book_class()
+    dune = Book.get("Dune")
+    dune.delete()
+    assert Book.get("Dune") is not dune
+    assert book_server.count("get_book") == 2
+
+    emma = Book.get("Emma")
+    emma.title = "Emma Woodhouse"
+    emma.update()
+    assert Book.get("Emma Woodhouse") is emma
+    assert Book.get("Emma") is not emma
+    assert book_server.count("get_book") == 4
+
+    # the entry is only moved when the key changes
+    ubik = Book.get("Ubik")
+    ubik.author = "Philip K. Dick"
+    ubik.update()
+    assert Book.get("Ubik") is ubik
+
+    book = Book(title="Persuasion")
+    book.add()
+    assert Book.get("Persuasion") is book
+    assert book_server.count("get_book") == 5
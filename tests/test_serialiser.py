@@ -1,6 +1,8 @@
 import marshmallow as mm
+import pytest
 
 from server_code import serialisation
+from tests.fake_tables import FakeAppTables
 
 COLUMNS = {
     "books": [
@@ -165,3 +167,293 @@ def test_schema():
     )
     result = schema().dump(AUTHORS, many=True)
     assert result == AUTHORS
+
+
+class Row(dict):
+    def get_id(self):
+        return f"[1,{dict.get(self, 'title')}]"
+
+
+def test_serialiser():
+    for table_name, linked_tables, rows in (
+        ("books", {}, BOOKS),
+        ("books", {"books": {"author": "authors"}}, BOOKS),
+        ("authors", {"authors": {"books": "books"}}, AUTHORS),
+    ):
+        schema = mm.Schema.from_dict(
+            serialisation._schema_definition(
+                table_name, COLUMNS, None, linked_tables, False
+            )
+        )()
+        serialiser = serialisation.RowSerialiser(
+            serialisation._serialiser(table_name, COLUMNS, None, linked_tables, False)
+        )
+        assert serialiser.dump(rows, many=True) == schema.dump(rows, many=True)
+        assert serialiser(rows[0]) == schema.dump(rows[0])
+
+    serialise = serialisation._serialiser(
+        "books", COLUMNS, {"books": ["publisher"]}, {}, True
+    )
+    row = Row(title=42, publisher="Pan")
+    assert serialise(row) == {"title": "42", "_id": "[1,42]"}
+    assert serialise(Row(title=None)) == {"title": None, "_id": "[1,None]"}
+
+    columns = {"books": [{"name": "cover", "type": "unsupported"}]}
+    with pytest.raises(ValueError):
+        serialisation._serialiser("books", columns, None, {}, False)
+
+
+def test_cache(monkeypatch):
+    assert serialisation._freeze(["a", "b"]) == serialisation._freeze(("a", "b"))
+    assert serialisation._freeze(
+        {"books": {"author": "authors"}, "authors": ["name"]}
+    ) == serialisation._freeze({"authors": ("name",), "books": {"author": "authors"}})
+    hash(serialisation._freeze({"books": ["title"]}))
+
+    calls = []
+
+    def build():
+        calls.append(1)
+        return len(calls)
+
+    serialisation.invalidate()
+    assert serialisation._cached("key", build) == 1
+    assert serialisation._cached("key", build) == 1
+    serialisation.invalidate()
+    assert serialisation._cached("key", build) == 2
+
+    now = [0]
+    monkeypatch.setattr(serialisation, "monotonic", lambda: now[0])
+    monkeypatch.setattr(serialisation, "CACHE_TTL", 10)
+    serialisation.invalidate()
+    assert serialisation._cached("key", build) == 3
+    now[0] = 9
+    assert serialisation._cached("key", build) == 3
+    now[0] = 10
+    assert serialisation._cached("key", build) == 4
+    serialisation.invalidate()
+
+
+def test_iter_serialise(monkeypatch):
+    assert list(serialisation._chunks(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(serialisation._chunks([], 2)) == []
+    with pytest.raises(ValueError):
+        list(serialisation._chunks([], 0))
+
+    monkeypatch.setattr(serialisation, "_columns", lambda table, linked: COLUMNS)
+    serialisation.invalidate()
+    consumed = []
+
+    def rows():
+        for book in BOOKS:
+            consumed.append(book)
+            yield book
+
+    chunks = serialisation.iter_serialise(
+        "books", rows(), linked_tables={"books": {"author": "authors"}}, chunk_size=2
+    )
+    assert next(chunks) == BOOKS[:2]
+    assert len(consumed) == 2
+    assert list(chunks) == [BOOKS[2:]]
+    serialisation.invalidate()
+
+
+class CountingRow(Row):
+    reads = 0
+
+    def __getitem__(self, key):
+        CountingRow.reads += 1
+        return super().__getitem__(key)
+
+
+def test_linked_rows_serialised_once():
+    adams = CountingRow(title="Douglas Adams", name="Douglas Adams")
+    books = [
+        {"title": "The Hitch Hiker's Guide to the Galaxy", "author": adams},
+        {"title": "The Restaurant at the End of the Universe", "author": adams},
+        {"title": "Practical Vim", "author": None},
+    ]
+    serialiser = serialisation.RowSerialiser(
+        serialisation._serialiser(
+            "books", COLUMNS, "publisher", {"books": {"author": "authors"}}, False
+        )
+    )
+    CountingRow.reads = 0
+    result = serialiser.dump(books, many=True)
+    assert CountingRow.reads == 1
+    assert [book["author"] for book in result] == [
+        {"name": "Douglas Adams"},
+        {"name": "Douglas Adams"},
+        None,
+    ]
+
+    authors = [{"name": "Douglas Adams", "books": [adams, adams]}]
+    serialiser = serialisation.RowSerialiser(
+        serialisation._serialiser(
+            "authors", COLUMNS, "publisher", {"authors": {"books": "books"}}, False
+        )
+    )
+    CountingRow.reads = 0
+    assert serialiser(authors[0])["books"] == [{"title": "Douglas Adams"}] * 2
+    assert CountingRow.reads == 1
+
+
+def test_linked_rows_not_shared():
+    adams = Row(title="Douglas Adams", name="Douglas Adams")
+    books = [
+        {"title": "Guide", "author": adams},
+        {"title": "Restaurant", "author": adams},
+    ]
+    serialiser = serialisation.RowSerialiser(
+        serialisation._serialiser(
+            "books", COLUMNS, "publisher", {"books": {"author": "authors"}}, False
+        )
+    )
+    first, second = serialiser.dump(books, many=True)
+    assert first["author"] is not second["author"]
+    first["author"]["name"] = "Adams"
+    assert second["author"] == {"name": "Douglas Adams"}
+
+
+def test_threaded_serialisation(monkeypatch):
+    import time
+
+    def slow_first(chunk):
+        time.sleep(0.01 * (3 - chunk[0] % 3))
+        return chunk[0]
+
+    chunks = serialisation._chunks(range(20), 2)
+    assert list(serialisation._map_threaded(slow_first, chunks, 3)) == list(
+        range(0, 20, 2)
+    )
+
+    def fail(chunk):
+        if chunk[0] == 4:
+            raise KeyError("title")
+        return chunk
+
+    results = serialisation._map_threaded(fail, serialisation._chunks(range(8), 2), 2)
+    assert next(results) == [0, 1]
+    assert next(results) == [2, 3]
+    with pytest.raises(serialisation.ChunkError) as e:
+        next(results)
+    assert e.value.index == 2 and isinstance(e.value.__cause__, KeyError)
+
+    monkeypatch.setattr(serialisation, "_columns", lambda table, linked: COLUMNS)
+    serialisation.invalidate()
+    rows = BOOKS * 10
+    chunks = serialisation.iter_serialise(
+        "books",
+        rows,
+        linked_tables={"books": {"author": "authors"}},
+        chunk_size=3,
+        workers=4,
+    )
+    assert [row for chunk in chunks for row in chunk] == rows
+    serialisation.invalidate()
+
+
+def test_columnar_serialiser():
+    linked_tables = {"books": {"author": "authors"}}
+    names, serialise_values = serialisation._values_serialiser(
+        "books", COLUMNS, None, linked_tables, True
+    )
+    assert names == ["title", "publisher", "author", "_id"]
+    serialiser = serialisation.ColumnarSerialiser(names, serialise_values)
+
+    rows = [Row(book, author=Row(book["author"])) for book in BOOKS]
+    rows.append(Row(title="Untitled"))
+    result = serialiser.dump(rows)
+    assert result["columns"] == names
+    expected = serialisation.RowSerialiser(
+        serialisation._serialiser("books", COLUMNS, None, linked_tables, True)
+    ).dump(rows, many=True)
+    assert [dict(zip(names, values)) for values in result["rows"][:-1]] == expected[:-1]
+    assert result["rows"][-1] == ["Untitled", None, None, "[1,Untitled]"]
+    assert serialiser(rows[0]) == result["rows"][0]
+
+
+@pytest.fixture
+def app_tables(monkeypatch):
+    app_tables = FakeAppTables()
+    authors = app_tables.add_table("authors", name="string")
+    books = app_tables.add_table(
+        "books",
+        title="string",
+        publisher="string",
+        pages="number",
+        in_print="bool",
+        author="link_single",
+    )
+    ramalho = authors.add_row(name="Luciano Ramalho")
+    adams = authors.add_row(name="Douglas Adams")
+    books.add_row(
+        title="Fluent Python",
+        publisher="O'Reilly",
+        pages=792,
+        in_print=True,
+        author=ramalho,
+    )
+    books.add_row(
+        title="Hitch Hiker's Guide",
+        publisher="Pan",
+        pages=159.5,
+        in_print=False,
+        author=adams,
+    )
+    books.add_row(title="Restaurant at the End", publisher="Pan", author=adams)
+    monkeypatch.setattr(serialisation, "app_tables", app_tables)
+    serialisation.invalidate()
+    yield app_tables
+    serialisation.invalidate()
+
+
+def test_fake_app_tables(app_tables):
+    linked_tables = {"books": {"author": "authors"}}
+    schema = serialisation.datatable_schema(
+        "books", ignore_columns="publisher", linked_tables=linked_tables, with_id=True
+    )
+    assert (
+        serialisation.datatable_schema(
+            "books",
+            ignore_columns=["publisher"],
+            linked_tables=linked_tables,
+            with_id=True,
+        )
+        is not schema
+    )
+    assert (
+        serialisation.datatable_schema(
+            "books", "publisher", linked_tables=linked_tables, with_id=True
+        )
+        is schema
+    )
+    expected = schema.dump(app_tables.books.search(), many=True)
+    assert expected[1] == {
+        "_id": "[2,2]",
+        "title": "Hitch Hiker's Guide",
+        "pages": 159.5,
+        "in_print": False,
+        "author": {"_id": "[1,2]", "name": "Douglas Adams"},
+    }
+    # marshmallow fetches the linked row for every book
+    assert app_tables.authors.fetches == 3
+
+    serialiser = serialisation.datatable_serialiser(
+        "books", "publisher", linked_tables=linked_tables, with_id=True
+    )
+    app_tables.authors.fetches = 0
+    result = serialiser.dump(app_tables.books.search(), many=True)
+    assert result == expected
+    assert app_tables.authors.fetches == 2
+    # an int in a number column is dumped as a float, as marshmallow does
+    assert [type(book["pages"]) for book in result] == [float, float, type(None)]
+    assert type(expected[0]["pages"]) is float
+
+    chunks = serialisation.iter_serialise(
+        "books", app_tables.books.search(publisher="Pan"), chunk_size=1
+    )
+    assert [chunk[0]["title"] for chunk in chunks] == [
+        "Hitch Hiker's Guide",
+        "Restaurant at the End",
+    ]
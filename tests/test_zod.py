@@ -1156,3 +1156,622 @@ def test_pipeline():
 
     r2 = schema.safe_parse("3")
     assert len(r2.error.issues) == 1
+
+
+def check_compiled(schema, values):
+    compiled = schema.compile()
+    for val in values:
+        expected = schema.safe_parse(val)
+        result = compiled.safe_parse(val)
+        assert result.success == expected.success, val
+        if expected.success:
+            assert result.data == expected.data
+        else:
+            assert result.error.message == expected.error.message
+
+
+def test_compile():
+    check_compiled(
+        z.string().strip().min(2).max(5).startswith("a").lower(),
+        ["abc", " Abc ", "a", "abcdefg", "bcd", 12, None, MISSING],
+    )
+    check_compiled(z.string().email(), ["foo@bar.com", "foo", "foo@bar", 42])
+    check_compiled(z.string().uuid(), [str(__import__("uuid").uuid4()), "1234"])
+    check_compiled(z.string().url(), ["https://anvil.works", "anvil"])
+    check_compiled(z.string().regex(re.compile(r"\d+")), ["123", "abc"])
+    check_compiled(z.string().datetime(), ["2021-01-01T00:00:00", "yesterday"])
+    check_compiled(z.string().date(format="%d/%m/%Y"), ["01/02/2021", "2021-01-01"])
+    check_compiled(z.coerce.string(), [1, True, None])
+    check_compiled(z.coerce.integer().gt(0), ["12", "abc", 3.5, 0])
+    check_compiled(z.number().int().lt(10), [1, 1.0, 1.5, 10, True, "1"])
+    check_compiled(z.float().ge(0).le(1), [0.5, 1, 1.5, -0.0])
+    check_compiled(z.boolean(), [True, False, 0, None])
+    check_compiled(z.coerce.boolean(), [0, "a"])
+    check_compiled(z.none(), [None, 0])
+    check_compiled(z.never(), [None, 0])
+    check_compiled(z.any(), [None, 0, [1]])
+    check_compiled(z.date().min(date(2021, 1, 1)), [date(2021, 1, 2), date(2020, 1, 1)])
+    check_compiled(
+        z.datetime().max(datetime(2021, 1, 1)),
+        [datetime(2020, 1, 1), datetime(2022, 1, 1), date(2020, 1, 1)],
+    )
+    check_compiled(z.literal("a"), ["a", "b", None])
+    check_compiled(z.literal(1), [1, True, 1.0])
+    check_compiled(z.enum(["a", "b"]), ["a", "c", [], None])
+    check_compiled(
+        z.list(z.integer()).min(1).max(3), [[1], (1, 2), [], [1, 2, 3, 4], ["a"], "a"]
+    )
+    check_compiled(
+        z.tuple([z.string(), z.integer()]).rest(z.boolean()),
+        [["a", 1], ("a", 1, True, False), ["a"], ["a", 1, 2]],
+    )
+    check_compiled(z.tuple([z.string()]), [["a"], ["a", "b"]])
+    check_compiled(
+        z.mapping(z.string(), z.integer().not_required()),
+        [{"a": 1}, {"a": MISSING}, {1: 1}, {"a": "b"}, []],
+    )
+
+    shape = {
+        "name": z.string(),
+        "age": z.integer().optional(),
+        "email": z.string().email().not_required(),
+        "role": z.enum(["admin", "user"]).default("user"),
+    }
+    values = [
+        {"name": "a", "age": None},
+        {"name": "a", "age": 1, "email": "a@b.com", "extra": 1},
+        {"name": "a", "age": 1, "email": "a"},
+        {"age": 1},
+        "name",
+    ]
+    check_compiled(z.typed_dict(shape), values)
+    check_compiled(z.typed_dict(shape).strict(), values)
+    check_compiled(z.typed_dict(shape).passthrough(), values)
+    check_compiled(z.typed_dict(shape).catchall(z.integer()), values)
+
+    check_compiled(z.union([z.string(), z.integer().catch(0)]), ["a", 1, None])
+    check_compiled(z.union([z.string(), z.integer()]), ["a", 1, None])
+    check_compiled(
+        z.string().refine(lambda s: s.isupper()).transform(len),
+        ["ABC", "abc", 1],
+    )
+    check_compiled(z.preprocess(str, z.string().min(2)), [12, 1])
+    check_compiled(z.string().transform(int).pipe(z.integer().lt(10)), ["1", "11", 1])
+
+    Category = z.lazy(
+        lambda: z.typed_dict({"name": z.string(), "subcategories": z.list(Category)})
+    )
+    tree = {"name": "a", "subcategories": [{"name": "b", "subcategories": []}]}
+    bad_tree = {"name": "a", "subcategories": [{"name": "b"}]}
+    check_compiled(Category, [tree, bad_tree])
+
+
+def test_compile_fallback():
+    paths = []
+
+    def check(data, ctx):
+        paths.append(ctx.path)
+        if data != "a":
+            ctx.add_issue(message="not a")
+
+    schema = z.typed_dict({"x": z.string().super_refine(check)}).compile()
+    assert schema.parse({"x": "a"}) == {"x": "a"}
+    assert paths == [["x"]]
+
+    result = schema.safe_parse({"x": "b"})
+    assert not result.success
+    assert result.error.message == "not a at ['x']"
+
+
+def test_compile_transform_calls():
+    calls = []
+
+    def count(value, ctx):
+        calls.append(value)
+        if value > 2:
+            ctx.add_issue(message="too long")
+        return value
+
+    schema = z.typed_dict(
+        {"x": z.string().transform(len).super_transform(count), "y": z.integer()}
+    ).compile()
+    assert schema.parse({"x": "ab", "y": 1}) == {"x": 2, "y": 1}
+    assert calls == [2]
+
+    # the compiled validator fails on y after the transform has run
+    result = schema.safe_parse({"x": "ab", "y": "a"}, path=["root"])
+    assert not result.success
+    assert calls == [2, 2]
+    assert result.error.issues[0].path == ["root", "y"]
+
+    # issues added by the transform are replayed by the full parse
+    result = schema.safe_parse({"x": "abc", "y": 1})
+    assert calls == [2, 2, 3]
+    assert result.error.issues[0].message == "too long"
+
+    results = list(schema.safe_parse_many([{"x": "a", "y": "a"}], path=["rows"]))
+    assert calls == [2, 2, 3, 1]
+    assert results[0].error.issues[0].path == ["rows", 0, "y"]
+
+
+def test_abort_early():
+    seen = []
+
+    def track(x):
+        seen.append(x)
+        return x
+
+    schema = z.list(z.preprocess(track, z.integer()))
+    result = schema.safe_parse([1, "a", "b", 4], abort_early=True)
+    assert not result.success
+    assert len(result.error.issues) == 1
+    assert result.error.issues[0].path == [1]
+    assert seen == [1, "a"]
+
+    result = schema.safe_parse([1, "a", "b", 4])
+    assert len(result.error.issues) == 2
+
+    schema = z.string().min(5).email()
+    assert len(schema.safe_parse("abc").error.issues) == 2
+    assert len(schema.safe_parse("abc", abort_early=True).error.issues) == 1
+
+    schema = z.typed_dict({"a": z.string(), "b": z.string()}).strict()
+    result = schema.safe_parse({"a": 1, "b": 2, "c": 3}, abort_early=True)
+    assert len(result.error.issues) == 1
+    assert result.error.issues[0].path == ["a"]
+
+    schema = z.mapping(z.string(), z.integer())
+    result = schema.safe_parse({"a": "a", "b": "b"}, abort_early=True)
+    assert len(result.error.issues) == 1
+
+    schema = z.tuple([z.string(), z.string()])
+    result = schema.safe_parse([1, 2], abort_early=True)
+    assert len(result.error.issues) == 1
+
+    schema = z.list(z.string().min(2)).refine(lambda x: False)
+    result = schema.safe_parse(["a"], abort_early=True)
+    assert len(result.error.issues) == 1
+
+    # unions and catch still try their options
+    schema = z.list(z.union([z.integer(), z.string()]))
+    assert schema.parse([1, "a"], abort_early=True) == [1, "a"]
+    schema = z.list(z.integer().catch(0))
+    assert schema.parse([1, "a"], abort_early=True) == [1, 0]
+
+
+def test_discriminated_union():
+    invoice = z.typed_dict({"type": z.literal("invoice"), "amount": z.integer()})
+    refund = z.typed_dict({"type": z.literal("refund"), "reason": z.string()})
+    other = z.typed_dict({"type": z.enum(["note", "memo"]), "text": z.string()})
+    schema = z.discriminated_union("type", [invoice, refund, other])
+
+    assert schema.discriminator == "type"
+    assert schema.options == [invoice, refund, other]
+
+    for val in [
+        {"type": "invoice", "amount": 10},
+        {"type": "refund", "reason": "broken"},
+        {"type": "memo", "text": "hello"},
+    ]:
+        assert schema.parse(val) == val
+        assert schema.compile().parse(val) == val
+
+    result = schema.safe_parse({"type": "refund", "amount": 10})
+    assert not result.success
+    assert result.error.issues[0].path == ["reason"]
+
+    result = schema.safe_parse({"type": "credit"})
+    assert result.error.issues[0].code == "invalid_union_discriminator"
+    assert result.error.issues[0].path == ["type"]
+    assert result.error.message == (
+        "Invalid discriminator value. Expected 'invoice' | 'refund' | 'note' | 'memo' at ['type']"
+    )
+
+    check_throws(schema, {"amount": 10})
+    check_throws(schema, {"type": ["invoice"]})
+    check_throws(schema, "invoice")
+    check_error_message(
+        z.discriminated_union("id", [z.typed_dict({"id": z.literal(1)})]),
+        {"id": True},
+        "Invalid discriminator value. Expected 1 at ['id']",
+    )
+
+    with pytest.raises(TypeError):
+        z.discriminated_union("type", [z.string()])
+    with pytest.raises(TypeError):
+        z.discriminated_union("type", [z.typed_dict({"type": z.string()})])
+    with pytest.raises(ValueError):
+        z.discriminated_union("type", [invoice, invoice])
+
+
+def test_parse_many():
+    schema = z.typed_dict({"id": z.integer(), "name": z.string()})
+    rows = [
+        {"id": 1, "name": "a"},
+        {"id": "2", "name": "b"},
+        {"id": 3, "name": "c"},
+        {"id": 4, "name": 4},
+    ]
+
+    for parser in (schema, schema.compile()):
+        results = list(parser.safe_parse_many(iter(rows)))
+        assert [r.success for r in results] == [True, False, True, False]
+        assert results[0].data == rows[0]
+        assert [i.path for i in results[1].error.issues] == [[1, "id"]]
+        assert [i.path for i in results[3].error.issues] == [[3, "name"]]
+
+        results = parser.safe_parse_many(rows, path=["rows"])
+        next(results)
+        assert next(results).error.issues[0].path == ["rows", 1, "id"]
+
+        values = parser.parse_many(rows)
+        assert next(values) == rows[0]
+        with pytest.raises(z.ParseError):
+            next(values)
+
+        assert list(parser.parse_many(rows[:1] + rows[2:3])) == [rows[0], rows[2]]
+
+
+def test_parse_many_isolates_items():
+    # the issue caught for the first item must not leak into the second
+    schema = z.typed_dict({"a": z.integer().catch(0), "b": z.string()})
+    results = list(schema.safe_parse_many([{"a": "x", "b": "ok"}, {"a": 1, "b": 2}]))
+    assert results[0].data == {"a": 0, "b": "ok"}
+    assert [i.path for i in results[1].error.issues] == [[1, "b"]]
+
+    seen = []
+    node = z.lazy(lambda: z.typed_dict({"id": z.integer()}), memo=True)
+    original_parse = node._parse
+
+    def parse(input):
+        seen.append(input.parent.common.memo)
+        return original_parse(input)
+
+    node._parse = parse
+    list(z.list(node).safe_parse_many([[{"id": 1}], [{"id": 2}]]))
+    assert seen[1] is None
+
+
+def test_parse_parallel():
+    row = z.typed_dict({"id": z.integer(), "name": z.string().not_required()})
+    rows = [{"id": i, "name": str(i)} for i in range(20)]
+    rows[3] = {"id": "3"}
+    rows[17] = {"id": 17, "name": 17}
+
+    schema = z.list(row).min(1)
+    expected = schema.safe_parse(rows)
+    result = schema.safe_parse_parallel(rows, workers=2, chunk_size=4)
+    assert not result.success
+    assert [i.path for i in result.error.issues] == [[3, "id"], [17, "name"]]
+    assert result.error.message == expected.error.message
+
+    result = schema.safe_parse_parallel(rows, workers=2, chunk_size=4, abort_early=True)
+    assert [i.path for i in result.error.issues] == [[3, "id"]]
+
+    rows[3] = {"id": 3}
+    rows[17] = {"id": 17}
+    assert schema.parse_parallel(rows, workers=2, chunk_size=4) == schema.parse(rows)
+
+    schema = z.mapping(z.string(), row)
+    data = {str(i): r for i, r in enumerate(rows)}
+    assert schema.parse_parallel(data, workers=2, chunk_size=4) == data
+    data["5"] = {"id": None}
+    result = schema.safe_parse_parallel(data, workers=2, chunk_size=4, path=["x"])
+    assert [i.path for i in result.error.issues] == [["x", "5", "id"]]
+
+    # small or non container inputs are parsed in process
+    assert z.list(row).max(1).safe_parse_parallel(rows, chunk_size=4).success is False
+    assert z.string().parse_parallel("a") == "a"
+
+
+def test_lazy_issues():
+    import pickle
+
+    calls = []
+
+    def error_map(issue, ctx):
+        calls.append(issue.code)
+        return {"message": ctx.default_error}
+
+    options = [
+        z.typed_dict({"type": z.literal(i), "value": z.string()}) for i in range(5)
+    ]
+    schema = z.list(z.union(options))
+    result = schema.safe_parse([{"type": 4, "value": 1}], error_map=error_map)
+    assert not result.success
+    assert calls == []
+
+    issue = result.error.issues[0]
+    assert issue.code == "invalid_union"
+    assert issue["path"] == [0]
+    assert calls == []
+
+    assert result.error.message == "Invalid input at [0]"
+    assert calls == ["invalid_union"]
+    assert result.error.format()[0]["value"]._errors[0] == (
+        "Expected string, received integer"
+    )
+
+    issue = pickle.loads(pickle.dumps(result.error.issues[0]))
+    assert issue.message == "Invalid input"
+    assert issue.path == [0]
+    assert issue.union_issues[4][0].path == [0, "value"]
+
+    issue["message"] = "custom"
+    assert issue.message == "custom"
+
+    # issues can be rewritten after a parse, e.g. to translate them
+    issue = result.error.issues[0]
+    issue.message = "Ungültige Eingabe"
+    issue.path = ["rows", 0]
+    assert issue["message"] == "Ungültige Eingabe"
+    assert issue.path == ["rows", 0]
+    assert issue.code == "invalid_union"
+    assert "code" in issue and issue.get("foo") is None
+    with pytest.raises(AttributeError):
+        issue.foo
+
+
+def test_lazy_error_message():
+    from client_code.zod import errors
+
+    result = z.typed_dict({"a": z.string()}).safe_parse({"a": 1})
+    errors.set_error_map(lambda issue, ctx: {"message": "changed"})
+    try:
+        # the error map is the one that was active during the parse
+        assert result.error.args == ("Expected string, received integer at ['a']",)
+        assert str(result.error.args[0]) == result.error.message
+        assert result.error.args[0].startswith("Expected")
+    finally:
+        errors.set_error_map(None)
+
+
+def test_parse_state_objects():
+    from client_code.zod.helpers.parse_util import Common, ParseContext
+
+    common = Common(issues=[], contextual_error_map=None)
+    ctx = ParseContext(
+        common=common,
+        path=["a"],
+        schema_error_map=None,
+        parent=None,
+        data=1,
+        parsed_type="integer",
+    )
+    assert not hasattr(ctx, "__dict__")
+    assert ctx["path"] == ["a"] and ctx.get("data") == 1 and "common" in ctx
+    assert {**common} == {
+        "issues": [],
+        "contextual_error_map": None,
+        "abort_early": False,
+        "copy_output": True,
+        "memo": None,
+    }
+
+    child = ctx.copy(common=common.copy(issues=[]), parent=ctx)
+    assert child.parent is ctx and child.data == 1
+    assert child.common is not common and child.common.issues is not common.issues
+    assert ctx.parent is None
+
+    result = z.string().safe_parse("a")
+    assert result["success"] and result.data == "a"
+
+
+def test_typed_dict_shape_cache():
+    calls = []
+
+    def get_shape():
+        calls.append(1)
+        return {"a": z.integer(), "b": z.string().not_required()}
+
+    schema = z.typed_dict({})
+    schema = type(schema)({**schema._def, "shape": get_shape})
+    assert not calls
+
+    for _ in range(3):
+        assert schema.parse({"a": 1, "c": 2}) == {"a": 1}
+    assert len(calls) == 1
+
+    assert schema.passthrough().parse({"a": 1, "c": 2}) == {"a": 1, "c": 2}
+    assert schema.catchall(z.integer()).parse({"a": 1, "c": 2}) == {"a": 1, "c": 2}
+    assert not schema.strict().safe_parse({"a": 1, "c": 2}).success
+    assert schema.extend({"c": z.integer()}).parse({"a": 1, "c": 2}) == {"a": 1, "c": 2}
+    assert schema.extend({"c": z.integer()}).compile().parse({"a": 1, "c": 2}) == {
+        "a": 1,
+        "c": 2,
+    }
+
+
+def test_regex_cache():
+    from client_code.zod.helpers import regex
+
+    assert regex.EMAIL is regex.EMAIL
+    assert regex.compile(r"^\d+$") is regex.compile(r"^\d+$")
+    compiled = re.compile("^moo+$")
+    assert regex.compile(compiled) is compiled
+
+    schema = z.string().regex(r"^\d+$")
+    # the pattern is compiled on the first parse, not when the schema is defined
+    check = schema._def["checks"][-1]
+    assert "match" not in check
+    assert schema.parse("123") == "123"
+    assert check["match"] == regex.compile(r"^\d+$").match
+    result = schema.safe_parse("abc")
+    assert not result.success
+    assert result.error.issues[0].validation == "regex"
+    check_compiled(schema, ["123", "abc"])
+
+    for i in range(regex._MAX_COMPILED + 1):
+        regex.compile(str(i))
+    assert len(regex._compiled) == regex._MAX_COMPILED
+    assert ("0", 0) not in regex._compiled
+
+
+def test_validator():
+    calls = []
+
+    def count(val):
+        calls.append(val)
+        return True
+
+    schema = z.typed_dict(
+        {
+            "name": z.string().min(2).refine(count),
+            "email": z.string().email(),
+            "age": z.integer().ge(0).not_required(),
+        }
+    ).refine(lambda d: d["name"] != d["email"], message="name and email match")
+    validator = schema.validator()
+
+    def check(data, changed=None):
+        result = validator.validate(data, changed)
+        n = len(calls)
+        expected = schema.safe_parse(data)
+        del calls[n:]
+        assert result.success == expected.success
+        if result.success:
+            assert result.data == expected.data
+        else:
+            issues = [(i.path, i.message) for i in result.error.issues]
+            assert issues == [(i.path, i.message) for i in expected.error.issues]
+        return result
+
+    data = {"name": "Al", "email": "al@example.com"}
+    assert check(data).success
+    calls.clear()
+
+    data["email"] = "not an email"
+    assert not check(data, ["email"]).success
+    assert calls == []  # name wasn't parsed again
+
+    data["age"] = -1
+    result = check(data, ["age"])
+    assert [issue.path for issue in result.error.issues] == [["email"], ["age"]]
+
+    data.update(email="Al@example.com", age=1)
+    assert check(data, {"email", "age"}).data == data
+
+    data["email"] = "Al"
+    result = check(data, ["email"])
+    assert not result.success and calls == []
+
+    data["name"] = "A"
+    result = check(data, ["name"])
+    assert calls == ["A"]
+    assert not result.success
+
+    assert not check("foo").success
+    assert check({"name": "Bob", "email": "b@example.com"}, ["name"]).success
+
+    # unknown keys are always checked
+    validator = schema._def["schema"].strict().validator()
+    assert not validator.validate({**data, "foo": 1}, []).success
+
+    with pytest.raises(TypeError):
+        z.string().validator()
+
+
+def test_validator_params():
+    schema = z.typed_dict({"a": z.integer(), "b": z.integer(), "c": z.string()})
+    validator = schema.validator(abort_early=True)
+    data = {"a": 1, "b": 2, "c": "z"}
+    assert validator.validate(data).success
+    data.update(a="x", b="y")
+    result = validator.validate(data, ["a", "b"])
+    assert [i.path for i in result.error.issues] == [["a"]]
+
+    # the abort skipped b, so it is parsed again even though only a changed
+    data["a"] = 1
+    result = validator.validate(data, ["a"])
+    assert [i.path for i in result.error.issues] == [["b"]]
+    data["b"] = 2
+    assert validator.validate(data, ["b"]).success
+
+    calls = []
+
+    def count(value):
+        calls.append(value)
+        return True
+
+    node = z.lazy(lambda: z.typed_dict({"id": z.integer()}).refine(count), memo=True)
+    shared = {"id": 1}
+    validator = z.typed_dict({"left": node, "right": node}).validator()
+    assert validator.validate({"left": shared, "right": shared}).success
+    assert calls == [shared]
+
+
+def test_lazy_memo():
+    calls = []
+
+    def get_category():
+        calls.append(1)
+        return z.typed_dict({"name": z.string(), "children": z.list(category)})
+
+    category = z.lazy(get_category)
+    leaf = {"name": "leaf", "children": []}
+    tree = {"name": "root", "children": [leaf, {"name": "b", "children": [leaf]}]}
+    assert category.parse(tree) == tree
+    assert category.parse(tree) == tree
+    assert len(calls) == 1
+
+    seen = []
+
+    def check(val):
+        seen.append(val)
+        return True
+
+    node = z.typed_dict({"name": z.string().refine(check)})
+    schema = z.list(z.lazy(lambda: node, memo=True))
+    item = {"name": "a"}
+    assert schema.parse([item, item, {"name": "b"}]) == [item, item, {"name": "b"}]
+    assert seen == ["a", "b"]
+
+    # invalid shared data is reported at each path
+    result = schema.safe_parse([{"name": 1}] * 2)
+    assert [issue.path for issue in result.error.issues] == [[0, "name"], [1, "name"]]
+
+    # cycles are reported rather than recursing forever
+    cyclic = z.lazy(
+        lambda: z.typed_dict({"name": z.string(), "children": z.list(cyclic)}),
+        memo=True,
+    )
+    data = {"name": "a", "children": []}
+    data["children"].append(data)
+    result = cyclic.safe_parse(data)
+    assert not result.success
+    assert result.error.issues[0].path == ["children", 0]
+    assert not cyclic.compile().safe_parse(data).success
+
+
+def test_copy_false():
+    schema = z.typed_dict(
+        {
+            "name": z.string(),
+            "tags": z.list(z.string()),
+            "scores": z.mapping(z.string(), z.integer()),
+            "point": z.tuple([z.integer(), z.integer()]),
+        }
+    )
+    data = {"name": "a", "tags": ["x"], "scores": {"x": 1}, "point": [1, 2]}
+
+    copied = schema.parse(data)
+    assert copied == data and copied is not data
+    assert copied["tags"] is not data["tags"]
+
+    shared = schema.parse(data, copy=False)
+    assert shared is data
+
+    # only containers whose values have all been returned unchanged are shared
+    stripped = schema.parse({**data, "extra": 1}, copy=False)
+    assert stripped == data and stripped["tags"] is data["tags"]
+
+    schema = z.typed_dict(
+        {"tags": z.list(z.string().upper()), "ids": z.list(z.integer())}
+    )
+    data = {"tags": ["a"], "ids": [1]}
+    result = schema.parse(data, copy=False)
+    assert result == {"tags": ["A"], "ids": [1]}
+    assert result is not data and result["ids"] is data["ids"]
+
+    data = (1, 2)
+    assert z.list(z.integer()).parse(data, copy=False) == [1, 2]